@@ -0,0 +1,187 @@
+import logging
+import os
+import signal
+import time
+from typing import Dict, List, Optional, Tuple
+
+CONTROLLERS = ("cpu", "memory")
+ENTER_SCRIPT = 'echo $$ > "$0/cgroup.procs"; exec "$@"'
+
+
+class CgroupManager:
+    POLL_INTERVAL = 0.05
+    REMOVE_TIMEOUT = 1
+
+    def __init__(self, root: Optional[str], logger: logging.Logger):
+        self.logger = logger
+        self.root = None
+        self.controllers = set()
+        self._limits: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+        self.configure(root)
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def configure(self, root: Optional[str]):
+        if root == self.root:
+            return
+        self.root = None
+        self.controllers = set()
+        self._limits = {}
+        if root is None:
+            return
+        if not os.path.isfile(os.path.join(root, "cgroup.controllers")):
+            self.logger.warning(f"No cgroup v2 hierarchy at {root}, running programs without cgroups")
+            return
+        if not os.access(root, os.W_OK):
+            self.logger.warning(f"Cgroup {root} is not writable, running programs without cgroups")
+            return
+        self.root = root
+        self._enable_controllers()
+        self.logger.info(f"Running programs in cgroups under {root}")
+
+    def _enable_controllers(self):
+        available = set(self._read(self.root, "cgroup.controllers").split())
+        wanted = [controller for controller in CONTROLLERS if controller in available]
+        try:
+            if wanted:
+                self._write(self.root, "cgroup.subtree_control", " ".join(f"+{controller}" for controller in wanted))
+        except OSError as e:
+            self.logger.warning(f"Failed to enable cgroup controllers in {self.root}: {e}")
+        self.controllers = set(self._read(self.root, "cgroup.subtree_control").split())
+
+    @staticmethod
+    def _read(path: str, filename: str) -> str:
+        with open(os.path.join(path, filename)) as file:
+            return file.read()
+
+    @staticmethod
+    def _write(path: str, filename: str, value: str):
+        with open(os.path.join(path, filename), "w") as file:
+            file.write(value)
+
+    def program_path(self, program_name: str) -> str:
+        return os.path.join(self.root, program_name)
+
+    def prepare(self, program_name: str, slot: int, program_config: dict) -> Optional[str]:
+        if not self.enabled:
+            return None
+        self.set_limits(program_name, program_config)
+        path = os.path.join(self.program_path(program_name), str(slot))
+        try:
+            os.makedirs(path, exist_ok=True)
+        except OSError as e:
+            self.logger.warning(f"Failed to create cgroup {path}: {e}")
+            return None
+        return path
+
+    @staticmethod
+    def command(path: str, args: List[str]) -> List[str]:
+        return ["/bin/sh", "-c", ENTER_SCRIPT, path] + args
+
+    def attach(self, path: str, pid: int) -> bool:
+        try:
+            self._write(path, "cgroup.procs", str(pid))
+        except OSError as e:
+            self.logger.warning(f"Failed to move process {pid} into cgroup {path}: {e}")
+            return False
+        return True
+
+    def set_limits(self, program_name: str, program_config: dict):
+        if not self.enabled:
+            return
+        limits = (program_config.get("cpu_max"), program_config.get("memory_max"))
+        if self._limits.get(program_name) == limits:
+            return
+        path = self.program_path(program_name)
+        try:
+            os.makedirs(path, exist_ok=True)
+            for controller, filename, value in zip(CONTROLLERS, ("cpu.max", "memory.max"), limits):
+                if controller in self.controllers:
+                    self._write(path, filename, "max" if value is None else str(value))
+                elif value is not None:
+                    self.logger.warning(
+                        f"The {controller} controller is not enabled in {self.root}, {filename} of {program_name} is not enforced")
+        except OSError as e:
+            self.logger.warning(f"Failed to set cgroup limits of {program_name}: {e}")
+            return
+        self._limits[program_name] = limits
+
+    def procs(self, path: str) -> List[int]:
+        try:
+            return [int(pid) for pid in self._read(path, "cgroup.procs").split()]
+        except OSError:
+            return []
+
+    def signal(self, path: str, sig: int):
+        for pid in self.procs(path):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def kill(self, path: str):
+        try:
+            self._write(path, "cgroup.kill", "1")
+        except FileNotFoundError:
+            self.signal(path, signal.SIGKILL)
+        except OSError as e:
+            self.logger.warning(f"Failed to kill cgroup {path}: {e}")
+
+    def populated(self, path: str) -> bool:
+        try:
+            events = self._read(path, "cgroup.events")
+        except FileNotFoundError:
+            return bool(self.procs(path))
+        except OSError:
+            return False
+        return "populated 1" in events
+
+    def wait_empty(self, path: str, deadline: float) -> bool:
+        while self.populated(path):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(remaining, self.POLL_INTERVAL))
+        return True
+
+    def remove(self, program_name: str, first_slot: int = 0):
+        if not self.enabled:
+            return
+        path = self.program_path(program_name)
+        try:
+            slots = [int(entry.name) for entry in os.scandir(path) if entry.is_dir() and entry.name.isdigit()]
+        except OSError:
+            return
+        for slot in sorted(slots):
+            if slot >= first_slot:
+                self._remove(os.path.join(path, str(slot)))
+        if first_slot == 0:
+            self._remove(path)
+            self._limits.pop(program_name, None)
+
+    def _remove(self, path: str):
+        self.kill(path)
+        self.wait_empty(path, time.monotonic() + self.REMOVE_TIMEOUT)
+        try:
+            os.rmdir(path)
+        except OSError as e:
+            self.logger.warning(f"Failed to remove cgroup {path}: {e}")
+
+    def usage(self, program_name: str) -> Tuple[Optional[float], Optional[int]]:
+        path = self.program_path(program_name)
+        cpu_seconds = memory_bytes = None
+        try:
+            for line in self._read(path, "cpu.stat").splitlines():
+                key, value = line.split()
+                if key == "usage_usec":
+                    cpu_seconds = int(value) / 1000000
+                    break
+        except (OSError, ValueError):
+            pass
+        try:
+            memory_bytes = int(self._read(path, "memory.current"))
+        except (OSError, ValueError):
+            pass
+        return cpu_seconds, memory_bytes
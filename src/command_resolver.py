@@ -0,0 +1,69 @@
+import os
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+
+class CommandResolver:
+    FALLBACK_PATHS = ['/usr/local/bin', '/usr/bin', '/bin']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listings: Dict[str, Tuple[int, FrozenSet[str]]] = {}
+        self._search_path: List[Tuple[str, FrozenSet[str]]] = []
+        self._resolved: Dict[str, Optional[str]] = {}
+        self._loaded = False
+
+    @classmethod
+    def path_directories(cls) -> List[str]:
+        directories = os.environ.get("PATH", os.defpath).split(os.pathsep) + cls.FALLBACK_PATHS
+        return list(dict.fromkeys(directory for directory in directories if directory))
+
+    def _list_directory(self, directory: str) -> Tuple[FrozenSet[str], bool]:
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return frozenset(), self._listings.pop(directory, None) is not None
+        cached = self._listings.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], False
+        try:
+            names = frozenset(os.listdir(directory))
+        except OSError:
+            names = frozenset()
+        self._listings[directory] = (mtime, names)
+        return names, True
+
+    def refresh(self):
+        with self._lock:
+            search_path = []
+            changed = False
+            for directory in self.path_directories():
+                names, directory_changed = self._list_directory(directory)
+                changed = changed or directory_changed
+                search_path.append((directory, names))
+            if changed or [d for d, _ in search_path] != [d for d, _ in self._search_path]:
+                self._resolved.clear()
+            self._search_path = search_path
+            self._loaded = True
+
+    @staticmethod
+    def _is_executable(path: str) -> bool:
+        return os.path.isfile(path) and os.access(path, os.X_OK)
+
+    def resolve(self, command: str) -> Optional[str]:
+        if os.sep in command:
+            return command if self._is_executable(command) else None
+        if not self._loaded:
+            self.refresh()
+        with self._lock:
+            if command in self._resolved:
+                return self._resolved[command]
+            resolved = None
+            for directory, names in self._search_path:
+                if command in names:
+                    path = os.path.join(directory, command)
+                    if self._is_executable(path):
+                        resolved = path
+                        break
+            self._resolved[command] = resolved
+            return resolved
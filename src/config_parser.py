@@ -1,12 +1,17 @@
 import yaml
-from schema import Schema, And, Use, Optional, SchemaError
+from schema import Schema, And, Or, Use, Optional, SchemaError
+import hashlib
 import os
 import signal
 from typing import Dict, Any, Tuple, List
-import subprocess
 import shlex
 import re
 
+from command_resolver import CommandResolver
+from dependency_graph import DependencyGraph
+from logger import DEFAULT_LOG_SETTINGS, LOG_ROTATE_INTERVALS
+
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 class ConfigValidationError(Exception):
@@ -14,6 +19,7 @@ class ConfigValidationError(Exception):
 
 
 class ConfigParser:
+	CPU_PERIOD = 100000
 	DEFAULT_VALUES: Dict[str, Any] = {
 		"numprocs": 1,
 		"umask": "022",
@@ -27,11 +33,33 @@ class ConfigParser:
 		"stoptime": 10,
 		"stdout": "/dev/null",
 		"stderr": "/dev/null",
-		"env": {}
+		"env": {},
+		"priority": 999,
+		"depends_on": [],
+		"capture": False,
+		"maxbytes": 10 * 1024 * 1024,
+		"backups": 5,
+		"tailbytes": 0
+	}
+	DEFAULT_SETTINGS: Dict[str, Any] = {
+		"maxspawns": 16,
+		"socket": "/tmp/taskmaster.sock",
+		"tailmemory": 16 * 1024 * 1024,
+		"metricsaddress": "127.0.0.1",
+		"metricsport": 0,
+		"sampleinterval": 5,
+		"cgroup": None,
+		"statefile": None,
+		**DEFAULT_LOG_SETTINGS
 	}
 	
+	command_resolver = CommandResolver()
+	
 	def __init__(self, config_file: str):
 		self.config_file = config_file
+		self._program_schema = None
+		self._parsed = None
+		self._stanzas: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
 	
 	@staticmethod
 	def validate_directory(path: str) -> str:
@@ -55,14 +83,51 @@ class ConfigParser:
 		return sig
 	
 	@staticmethod
-	def get_system_commands():
-		system_paths = ['/usr/bin', '/bin', '/usr/local/bin']
-		commands = set()
-		for path in system_paths:
-			if os.path.exists(path):
-				commands.update(os.listdir(path))
-		return commands
-
+	def validate_restart_batch(batch):
+		if isinstance(batch, str):
+			if not re.fullmatch(r"\d+%", batch) or not 0 < int(batch[:-1]) <= 100:
+				raise ConfigValidationError(f"Invalid restart batch: {batch}")
+		elif batch <= 0:
+			raise ConfigValidationError(f"Invalid restart batch: {batch}")
+		return batch
+	
+	@staticmethod
+	def parse_size(size) -> int:
+		if isinstance(size, int):
+			return size
+		match = re.fullmatch(r"\s*(\d+)\s*([KMGT]?)B?\s*", size.upper())
+		if not match:
+			raise ConfigValidationError(f"Invalid size: {size}")
+		return int(match.group(1)) * 1024 ** " KMGT".index(match.group(2) or " ")
+	
+	@classmethod
+	def parse_cpu_max(cls, cpu_max) -> str:
+		if isinstance(cpu_max, str):
+			cpu_max = cpu_max.strip()
+			if re.fullmatch(r"max|(\d+|max) \d+", cpu_max):
+				return cpu_max
+			if re.fullmatch(r"\d+%", cpu_max) and int(cpu_max[:-1]) > 0:
+				return f"{cls.CPU_PERIOD * int(cpu_max[:-1]) // 100} {cls.CPU_PERIOD}"
+		raise ConfigValidationError(f"Invalid cpu_max: {cpu_max}")
+	
+	@staticmethod
+	def validate_dependencies(programs: Dict[str, Any]):
+		graph = DependencyGraph(programs)
+		for program_name, missing in graph.unknown_dependencies().items():
+			raise ConfigValidationError(f"Program {program_name} depends on unknown program: {', '.join(missing)}")
+		cycle = graph.find_cycle()
+		if cycle:
+			raise ConfigValidationError(f"Dependency cycle: {' -> '.join(cycle)}")
+	
+	@staticmethod
+	def validate_groups(config: Dict[str, Any]):
+		for group_name, members in config.get("groups", {}).items():
+			if group_name in config["programs"] or group_name == "all":
+				raise ConfigValidationError(f"Group {group_name} has the same name as a program")
+			missing = [member for member in members if member not in config["programs"]]
+			if missing:
+				raise ConfigValidationError(f"Group {group_name} contains unknown program: {', '.join(missing)}")
+	
 	@staticmethod
 	def get_shell_builtins() -> set[str]:
 		return {
@@ -77,12 +142,9 @@ class ConfigParser:
 
 	@classmethod
 	def validate_command(cls, cmd: str) -> str:
-		system_commands = cls.get_system_commands()
 		shell_builtins = cls.get_shell_builtins()
-		all_commands = system_commands.union(shell_builtins)
 		def is_valid_command(command):
-			return command in all_commands or subprocess.run(['which', command], stdout=subprocess.DEVNULL,
-			                                                    stderr=subprocess.DEVNULL).returncode == 0
+			return command in shell_builtins or cls.command_resolver.resolve(command) is not None
 		
 		try:
 			sub_commands = cmd.replace('&&', ';;').replace('||', ';;').split(';;')
@@ -99,32 +161,70 @@ class ConfigParser:
 			raise ConfigValidationError(f"Invalid command syntax: {e}")
 	
 	@classmethod
-	def get_schema(cls) -> Schema:
+	def get_schema(cls, program_schema=None) -> Schema:
 		return Schema({
-			"programs": {
-				str: {
-					"cmd": And(str, cls.validate_command),
-					Optional("numprocs"): And(int, lambda n: n > 0),
-					Optional("umask"): And(str, lambda s: len(s) == 3 and s.isdigit()),
-					Optional("workingdir"): And(str, cls.validate_directory),
-					Optional("autostart"): bool,
-					Optional("autorestart"): And(str, Use(str.lower), lambda s: s in ("always", "never", "unexpected")),
-					Optional("exitcodes"): [And(int, lambda n: -128 <= n <= 255)],
-					Optional("startretries"): And(int, lambda n: n >= 0),
-					Optional("starttime"): And(int, lambda n: n >= 0),
-					Optional("stopsignal"): And(str, cls.validate_signal),
-					Optional("stoptime"): And(int, lambda n: n >= 0),
-					Optional("stdout"): And(str, cls.validate_file_path),
-					Optional("stderr"): And(str, cls.validate_file_path),
-					Optional("env"): {Optional(str): str}
-				}
-			}
+			Optional("taskmaster"): {
+				Optional("maxspawns"): And(int, lambda n: n > 0),
+				Optional("socket"): And(str, len),
+				Optional("tailmemory"): And(int, lambda n: n >= 0),
+				Optional("metricsaddress"): And(str, len),
+				Optional("metricsport"): And(int, lambda n: 0 <= n <= 65535),
+				Optional("sampleinterval"): And(Or(int, float), lambda n: n >= 0),
+				Optional("cgroup"): And(str, len, Use(os.path.abspath)),
+				Optional("statefile"): And(str, len, Use(os.path.abspath), cls.validate_file_path),
+				Optional("logfile"): And(str, Use(os.path.abspath), cls.validate_file_path),
+				Optional("loglevel"): And(str, Use(str.upper), lambda s: s in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")),
+				Optional("logformat"): And(str, Use(str.lower), lambda s: s in ("text", "json")),
+				Optional("logmaxbytes"): And(int, lambda n: n >= 0),
+				Optional("logbackups"): And(int, lambda n: n >= 0),
+				Optional("logrotate"): And(str, Use(str.lower), lambda s: s in LOG_ROTATE_INTERVALS)
+			},
+			Optional("groups"): {Optional(str): And([str], len)},
+			"programs": {str: program_schema or cls.get_program_schema()}
+		})
+	
+	@classmethod
+	def get_program_schema(cls) -> Schema:
+		return Schema({
+			"cmd": And(str, cls.validate_command),
+			Optional("numprocs"): And(int, lambda n: n > 0),
+			Optional("umask"): And(str, lambda s: len(s) == 3 and s.isdigit()),
+			Optional("workingdir"): And(str, cls.validate_directory),
+			Optional("autostart"): bool,
+			Optional("autorestart"): And(str, Use(str.lower), lambda s: s in ("always", "never", "unexpected")),
+			Optional("exitcodes"): [And(int, lambda n: -128 <= n <= 255)],
+			Optional("startretries"): And(int, lambda n: n >= 0),
+			Optional("starttime"): And(int, lambda n: n >= 0),
+			Optional("stopsignal"): And(str, cls.validate_signal),
+			Optional("stoptime"): And(int, lambda n: n >= 0),
+			Optional("stdout"): And(str, cls.validate_file_path),
+			Optional("stderr"): And(str, cls.validate_file_path),
+			Optional("env"): {Optional(str): str},
+			Optional("restartbatch"): And(Or(int, str), cls.validate_restart_batch),
+			Optional("priority"): int,
+			Optional("depends_on"): [str],
+			Optional("capture"): bool,
+			Optional("maxbytes"): And(int, lambda n: n >= 0),
+			Optional("backups"): And(int, lambda n: n >= 0),
+			Optional("tailbytes"): And(int, lambda n: n >= 0),
+			Optional("rlimit_nofile"): And(int, lambda n: n > 0),
+			Optional("rlimit_as"): And(Or(int, str), Use(cls.parse_size), lambda n: n > 0),
+			Optional("max_rss"): And(Or(int, str), Use(cls.parse_size), lambda n: n > 0),
+			Optional("max_rss_grace"): And(Or(int, float), lambda n: n >= 0),
+			Optional("cpu_affinity"): And([And(int, lambda n: n >= 0)], len),
+			Optional("nice"): And(int, lambda n: -20 <= n <= 19),
+			Optional("cpu_max"): Use(cls.parse_cpu_max),
+			Optional("memory_max"): And(Or(int, str), Use(cls.parse_size), lambda n: n > 0)
 		})
 	
 	def parse(self) -> Tuple[str, Dict[str, Any]]:
 		try:
-			with open(self.config_file, "r") as file:
-				content = file.read()
+			with open(self.config_file, "rb") as file:
+				raw_content = file.read()
+			digest = hashlib.sha256(raw_content).digest()
+			if self._parsed is not None and self._parsed[0] == digest:
+				return None, self._parsed[1]
+			content = raw_content.decode()
 			
 			programs_count = len(re.findall(r'^\s*programs\s*:', content, re.MULTILINE))
 			if programs_count == 0:
@@ -132,13 +232,18 @@ class ConfigParser:
 			elif programs_count > 1:
 				raise ConfigValidationError("Multiple 'programs' keys found in configuration")
 			
-			config = yaml.safe_load(content)
+			config = yaml.load(content, Loader=SafeLoader)
+			self.command_resolver.refresh()
 			
 			if "programs" not in config:
 				raise ConfigValidationError("Missing 'programs' key in configuration")
 			
-			validated_config = self.get_schema().validate(config)
-			return None, self.apply_defaults(validated_config)
+			validated_config = self.get_schema(dict).validate(config)
+			validated_config["programs"] = self.validate_programs(config["programs"])
+			self.validate_dependencies(validated_config["programs"])
+			self.validate_groups(validated_config)
+			self._parsed = (digest, self.apply_defaults(validated_config))
+			return None, self._parsed[1]
 		except SchemaError as e:
 			return f"Schema validation error: {e}", None
 		except yaml.YAMLError as e:
@@ -150,8 +255,30 @@ class ConfigParser:
 		except Exception as e:
 			return f"Unexpected error: {e}", None
 	
+	def validate_programs(self, programs: Dict[str, Any]) -> Dict[str, Any]:
+		if self._program_schema is None:
+			self._program_schema = self.get_program_schema()
+		stanzas = {}
+		for program_name, program_config in programs.items():
+			cached = self._stanzas.get(program_name)
+			if cached is not None and cached[0] == program_config:
+				stanzas[program_name] = cached
+				continue
+			try:
+				stanzas[program_name] = (program_config, self._program_schema.validate(program_config))
+			except SchemaError as e:
+				raise SchemaError(
+					["Key 'programs' error:", f"Key '{program_name}' error:"] + e.autos, [None, None] + e.errors)
+		self._stanzas = stanzas
+		return {program_name: validated for program_name, (_, validated) in stanzas.items()}
+	
 	@classmethod
 	def apply_defaults(cls, config: Dict[str, Any]) -> Dict[str, Any]:
+		settings = config.setdefault("taskmaster", {})
+		config.setdefault("groups", {})
+		for key, default_value in cls.DEFAULT_SETTINGS.items():
+			if key not in settings:
+				settings[key] = default_value
 		for program_config in config["programs"].values():
 			for key, default_value in cls.DEFAULT_VALUES.items():
 				if key not in program_config:
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import stat
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from program_selector import ProgramSelector
+
+
+class ControlServer:
+    BLOCKING_COMMANDS = {"start", "stop", "restart", "reload"}
+    MAX_REQUEST_SIZE = 64 * 1024
+
+    def __init__(self, taskmaster, socket_path: str, logger: logging.Logger):
+        self.taskmaster = taskmaster
+        self.socket_path = socket_path
+        self.logger = logger
+        self.handlers: Dict[str, Callable[..., Any]] = {
+            "status": self.status,
+            "config": self.config,
+            "start": self.start_program,
+            "stop": self.stop_program,
+            "restart": self.restart_program,
+            "reload": self.reload,
+            "tail": self.tail,
+            "metrics": self.metrics,
+        }
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread = None
+        self._started = threading.Event()
+        self._socket_inode: Optional[int] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self):
+        if self._socket_in_use():
+            self.logger.error(f"Control server not started: another server is listening on {self.socket_path}")
+            return
+        self._remove_stale_socket()
+        self._started.clear()
+        self._thread = threading.Thread(target=self._run, name="taskmaster-control-server", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self._remove_own_socket()
+
+    def _socket_in_use(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                return False
+        return True
+
+    def _remove_own_socket(self):
+        if self._socket_inode is None:
+            return
+        try:
+            if os.stat(self.socket_path).st_ino == self._socket_inode:
+                os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        self._socket_inode = None
+
+    def _remove_stale_socket(self):
+        try:
+            if stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+                os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            server = loop.run_until_complete(
+                asyncio.start_unix_server(self._handle_client, path=self.socket_path, limit=self.MAX_REQUEST_SIZE)
+            )
+            os.chmod(self.socket_path, 0o600)
+            self._socket_inode = os.stat(self.socket_path).st_ino
+        except OSError as e:
+            self.logger.error(f"Failed to start control server on {self.socket_path}: {e}")
+            loop.close()
+            self._started.set()
+            return
+        self._loop = loop
+        self.logger.info(f"Control server listening on {self.socket_path}")
+        loop.call_soon(self._started.set)
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            self._loop = None
+            self.logger.info("Control server stopped")
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(self._encode({"ok": False, "error": "Request too large"}))
+                    break
+                if not line:
+                    break
+                writer.write(self._encode(await self._dispatch(line)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _encode(response: dict) -> bytes:
+        return json.dumps(response, default=str).encode() + b"\n"
+
+    async def _dispatch(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+            command = request["command"]
+            args = request.get("args") or {}
+            handler = self.handlers[command]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return {"ok": False, "error": f"Invalid request: {e}"}
+        try:
+            if command in self.BLOCKING_COMMANDS:
+                result = await asyncio.get_running_loop().run_in_executor(None, lambda: handler(**args))
+            else:
+                result = handler(**args)
+        except Exception as e:
+            self.logger.error(f"Control command {command} failed: {e}")
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "result": result}
+
+    def _resolve(self, selector: str) -> List[str]:
+        return ProgramSelector.for_config(self.taskmaster.config).resolve(selector)
+
+    def status(self, program: Optional[str] = None, states: Optional[List[str]] = None) -> dict:
+        if program is None:
+            return self.taskmaster.status(None, states)
+        program_names = self._resolve(program)
+        status = self.taskmaster.status(program, states)
+        return {name: status[name] for name in program_names if name in status}
+
+    def config(self) -> dict:
+        return self.taskmaster.config
+
+    def start_program(self, program: str):
+        self._resolve(program)
+        self.taskmaster.start_program(program)
+
+    def stop_program(self, program: str):
+        self._resolve(program)
+        self.taskmaster.stop_program(program)
+
+    def restart_program(self, program: str, batch=None):
+        self._resolve(program)
+        self.taskmaster.restart_program(program, batch)
+
+    def reload(self):
+        self.taskmaster.reload_config()
+
+    def metrics(self) -> str:
+        return self.taskmaster.render_metrics()
+
+    def tail(self, program: str, offsets: Optional[Dict[str, int]] = None) -> dict:
+        if program not in self.taskmaster.config["programs"]:
+            raise ValueError(f"Program {program} not found")
+        offsets = {int(slot): offset for slot, offset in (offsets or {}).items()}
+        return self.taskmaster.tail(program, offsets)
@@ -1,10 +1,52 @@
+import argparse
 import cmd
+import math
 import signal
 import sys
+import time
 
 import yaml
 from prettytable import PrettyTable
 
+from job_manager import JobManager
+from program_selector import ProgramSelector
+
+STATUS_COLUMNS = {
+    "program": "Program",
+    "name": "Name",
+    "instance": "Instance",
+    "pid": "PID",
+    "cmd": "Command",
+    "status": "Status",
+    "state": "State",
+    "restarts": "Restarts",
+    "uptime": "Uptime",
+    "exit_code": "Exit",
+    "cpu": "CPU",
+    "rss": "RSS",
+    "threads": "Threads",
+    "fds": "FDs",
+}
+TABLE_COLUMNS = ["program", "pid", "cmd", "status", "state", "restarts", "uptime", "cpu", "rss", "threads", "fds"]
+COMPACT_COLUMNS = ["program", "instance", "pid", "state", "restarts", "uptime", "cpu", "rss"]
+PAGE_SIZE = 50
+
+
+class ShellArgumentParser(argparse.ArgumentParser):
+    def error(self, message):
+        raise ValueError(f"{self.format_usage().strip()}\n{self.prog}: {message}")
+
+
+def status_parser() -> ShellArgumentParser:
+    parser = ShellArgumentParser(prog="status", add_help=False)
+    parser.add_argument("selector", nargs="?")
+    parser.add_argument("-s", "--state", help="comma-separated states to show")
+    parser.add_argument("-c", "--columns", help="comma-separated columns of the compact output")
+    parser.add_argument("-p", "--page", type=int, help="page of the compact output")
+    parser.add_argument("-n", "--page-size", type=int, help="rows per page of the compact output")
+    return parser
+
+
 class ControlShell(cmd.Cmd):
     intro = (
         "Hey!😊\n"
@@ -12,32 +54,58 @@ class ControlShell(cmd.Cmd):
         "Type 'help' or '？' to list commands."
     )
     prompt = "(taskmaster) "
+    tail_interval = 0.5
     
 
     def __init__(self, taskmaster):
         super().__init__()
         self.taskmaster = taskmaster
         self.command_history = []
+        self.jobs = JobManager()
         signal.signal(signal.SIGINT, self.signal_handler)
     
     def help_history(self):
         print("Show command history.")
 
     def help_status(self):
-        print("Show status of programs.")
+        print("Show status of programs: status [selector] [-s STATE,...] [-c COLUMN,...] [-p PAGE] [-n PAGE_SIZE]")
+        print("-s keeps instances in the given states. -c, -p or -n switch to a compact, paged listing.")
+        print(f"Columns: {', '.join(STATUS_COLUMNS)}")
 
     def help_start(self):
-        print("Start a program or all programs.")
+        print("Start programs: start <selector>")
+        self._help_selectors()
 
     def help_stop(self):
-        print("Stop a program.")
+        print("Stop programs: stop <selector>")
+        self._help_selectors()
 
     def help_restart(self):
-        print("Restart a program.")
+        print("Restart programs: restart <selector> [batch]")
+        print("With a batch size (e.g. 2 or 25%), processes are replaced in rolling batches.")
+        self._help_selectors()
+
+    @staticmethod
+    def _help_selectors():
+        print("A selector is a program, a group, 'all', a glob (web-*) or a regex (re:web-\\d+),")
+        print("or several of them separated by commas. Selected programs are handled concurrently.")
 
     def help_reload(self):
         print("Reload the configuration.")
 
+    def help_tail(self):
+        print("Show recent output of a program: tail <program> [-f]")
+        print("With -f, keep printing new output until Ctrl-C.")
+
+    def help_metrics(self):
+        print("Show supervisor and process metrics in Prometheus text format.")
+
+    def help_jobs(self):
+        print("List background jobs started by start, stop, restart and reload.")
+
+    def help_wait(self):
+        print("Wait for a background job (or all jobs) to finish: wait [job_id]")
+
     def help_quit(self):
         print("Exit the shell.")
 
@@ -52,77 +120,175 @@ class ControlShell(cmd.Cmd):
         print("Show the configuration of a program.")
     
     def do_status(self, arg):
-        status = self.taskmaster.status()
-        config_programs = set(self.taskmaster.config["programs"].keys())
+        try:
+            args = status_parser().parse_args(arg.split())
+            columns = args.columns.split(",") if args.columns else None
+            unknown = [column for column in columns or [] if column not in STATUS_COLUMNS]
+            if unknown:
+                raise ValueError(f"Unknown column: {', '.join(unknown)}")
+            program_names = list(self.taskmaster.config["programs"])
+            if args.selector:
+                program_names = ProgramSelector.for_config(self.taskmaster.config).resolve(args.selector)
+        except ValueError as e:
+            print(e)
+            return
+        states = [state.upper() for state in args.state.split(",")] if args.state else None
+        status = self.taskmaster.status(args.selector, states)
+        rows = self._status_rows(program_names, status, states is None)
         
+        if columns or args.page or args.page_size:
+            self._print_compact(rows, columns or COMPACT_COLUMNS, args.page or 1, args.page_size or PAGE_SIZE)
+            return
         table = PrettyTable()
-        table.field_names = ["Program", "PID", "Command", "Status", "Restarts", "Uptime"]
+        table.field_names = [STATUS_COLUMNS[column] for column in TABLE_COLUMNS]
         table.align["Program"] = "l"
-        
-        if arg:
-            if arg in config_programs:
-                if arg in status:
-                    for process in status[arg]:
-                        table.add_row([arg, process['pid'], process['cmd'], process['status'], process['restarts'],
-                                       f"{process['uptime']} seconds"])
-                else:
-                    table.add_row([arg, "N/A", "N/A", "not started", "N/A", "N/A"])
-            else:
-                print(f"Program {arg} not found")
-                return
-        else:
-            for program_name in config_programs:
-                if program_name in status:
-                    for process in status[program_name]:
-                        table.add_row([program_name, process['pid'], process['cmd'], process['status'], process['restarts'],
-                                       f"{process['uptime']} seconds"])
-                else:
-                    table.add_row([program_name, "N/A", "N/A", "not started", "N/A", "N/A"])
+        for row in rows:
+            table.add_row([self._format_status(column, row.get(column)) for column in TABLE_COLUMNS])
         print(table)
+
+    @staticmethod
+    def _status_rows(program_names, status: dict, include_not_started: bool) -> list:
+        rows = []
+        for program_name in program_names:
+            if program_name not in status:
+                if include_not_started:
+                    rows.append({"program": program_name, "status": "not started"})
+                continue
+            for process in status[program_name]:
+                rows.append(dict(process, program=program_name))
+        return rows
+
+    @staticmethod
+    def _format_status(column: str, value) -> str:
+        if value is None:
+            return "N/A"
+        if column == "uptime":
+            return f"{value} seconds"
+        if column == "cpu":
+            return f"{value:.1f}%"
+        if column == "rss":
+            return f"{value / (1024 * 1024):.1f} MiB"
+        return str(value)
+
+    def _print_compact(self, rows: list, columns: list, page: int, page_size: int):
+        page_size = max(1, page_size)
+        pages = max(1, math.ceil(len(rows) / page_size))
+        page = min(max(1, page), pages)
+        cells = [
+            [self._format_status(column, row.get(column)) for column in columns]
+            for row in rows[(page - 1) * page_size:page * page_size]
+        ]
+        headers = [STATUS_COLUMNS[column] for column in columns]
+        widths = [max([len(header)] + [len(line[index]) for line in cells]) for index, header in enumerate(headers)]
+        lines = ["  ".join(text.ljust(width) for text, width in zip(line, widths)).rstrip()
+                 for line in [headers] + cells]
+        lines.append(f"Page {page}/{pages} ({len(rows)} instances)")
+        print("\n".join(lines))
     
     def do_start(self, arg: str):
         if not arg:
             print("Please specify a program name or 'all' to start all programs")
             return
-        if arg == 'all':
-            programs = self.taskmaster.config["programs"]
-            for program_name in programs.keys():
-                self.taskmaster.start_program(program_name)
-                self._print_program_status(program_name)
-        else:
-            self.taskmaster.start_program(arg)
-            self._print_program_status(arg)
+        self._track_job(f"start {arg}", lambda progress: self.taskmaster.start_program(arg, progress))
 
     def do_stop(self, arg: str):
-        if arg == 'all':
-            self.taskmaster.stop_all_programs()
-            print("All programs stopped")
-            return
         if not arg:
             print("Please specify a program name")
             return
-        self.taskmaster.stop_program(arg)
+        self._track_job(f"stop {arg}", lambda progress: self.taskmaster.stop_program(arg, progress))
     
     def do_restart(self, arg: str):
         if not arg:
             print("Please specify a program name or 'all' to restart all programs")
             return
         
-        if arg.lower() == 'all':
-            self.taskmaster.restart_all_programs()
-            print("All programs restarted")
+        program_name, _, batch = arg.partition(' ')
+        batch = batch.strip()
+        self._track_job(
+            f"restart {arg}", lambda progress: self.taskmaster.restart_program(program_name, batch or None, progress))
+
+    def do_reload(self, arg: str):
+        self._track_job("reload", self.taskmaster.reload_config)
+
+    def do_tail(self, arg: str):
+        args = arg.split()
+        follow = "-f" in args
+        program_names = [name for name in args if name != "-f"]
+        if len(program_names) != 1:
+            print("Usage: tail <program> [-f]")
+            return
+        program_name = program_names[0]
+        if program_name not in self.taskmaster.config["programs"]:
+            print(f"Program {program_name} not found")
             return
         
-        self.taskmaster.restart_program(arg)
-        self._print_program_status(arg)
+        offsets = self._print_tail(program_name, {})
+        if not follow:
+            if not offsets:
+                print(f"No output recorded for {program_name} (set tailbytes to keep recent output)")
+            return
+        previous_handler = signal.signal(signal.SIGINT, signal.default_int_handler)
+        try:
+            while True:
+                time.sleep(self.tail_interval)
+                offsets = self._print_tail(program_name, offsets)
+        except KeyboardInterrupt:
+            print()
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
 
-    def do_reload(self, arg: str):
-        self.taskmaster.reload_config()
-        print("Configuration reloaded. Current status:")
-        self.do_status(arg)
+    def _print_tail(self, program_name: str, offsets: dict) -> dict:
+        output = self.taskmaster.tail(program_name, offsets)
+        for slot, (offset, data) in output.items():
+            if not data:
+                continue
+            if len(output) > 1:
+                print(f"==> {program_name}:{slot} <==")
+            print(data, end="" if data.endswith("\n") else "\n")
+        return {slot: offset for slot, (offset, _) in output.items()}
+
+    def do_metrics(self, arg: str):
+        print(self.taskmaster.render_metrics(), end="")
+
+    def do_jobs(self, arg: str):
+        table = PrettyTable()
+        table.field_names = ["Job", "Command", "State", "Progress", "Elapsed"]
+        table.align["Command"] = "l"
+        for job in self.jobs.jobs.values():
+            table.add_row([job.id, job.description, job.state, job.progress, f"{job.elapsed:.1f} seconds"])
+        print(table)
+
+    def do_wait(self, arg: str):
+        if not arg:
+            self.jobs.wait_all()
+            self._report_finished_jobs()
+            return
+        try:
+            job = self.jobs.wait(int(arg))
+        except ValueError:
+            print(f"Invalid job id: {arg}")
+            return
+        if job is None:
+            print(f"Job {arg} not found")
+            return
+        self._report_finished_jobs()
+
+    def _track_job(self, description: str, action):
+        job = self.jobs.track(description, action)
+        print(f"[{job.id}] {description} started")
+
+    def _report_finished_jobs(self):
+        for job in self.jobs.collect_finished():
+            if job.state == "failed":
+                print(f"[{job.id}] {job.description} failed: {job.error}")
+            else:
+                print(f"[{job.id}] {job.description} done in {job.elapsed:.1f} seconds")
 
     def do_quit(self, arg: str):
         print("Exiting Taskmaster...")
+        if self.jobs.has_unfinished():
+            print("Waiting for running jobs to finish...")
+        self.jobs.shutdown()
         self.taskmaster.stop_all_programs()
         return True
 
@@ -141,26 +307,18 @@ class ControlShell(cmd.Cmd):
         else:
             print(f"Program {arg} not found")
     
-    def _print_program_status(self, program_name: str):
-
-        status = self.taskmaster.status()
-        if program_name in status:
-            print(f"Status of {program_name}:")
-            table = PrettyTable()
-            table.field_names = ["Program", "PID", "Command", "Status", "Restarts", "Uptime"]
-            for process in status[program_name]:
-                table.add_row([program_name, process['pid'], process['cmd'], process['status'], process['restarts'],
-                               f"{process['uptime']} seconds"])
-            print(table)
-        else:
-            print(f"Process with {program_name} not found")
-    
     def signal_handler(self):
         print("\nReceived SIGINT, stopping all programs and exiting...")
+        self.jobs.shutdown()
         self.taskmaster.stop_all_programs()
         sys.exit(0)
     
     def precmd(self, line: str):
         if line != '':
             self.command_history.append(line)
-        return line
\ No newline at end of file
+        return line
+
+    def postcmd(self, stop: bool, line: str) -> bool:
+        if not stop:
+            self._report_finished_jobs()
+        return stop
\ No newline at end of file
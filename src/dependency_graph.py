@@ -0,0 +1,60 @@
+from typing import Dict, Iterable, List, Optional
+
+
+class DependencyGraph:
+    def __init__(self, programs: Dict[str, dict]):
+        self.dependencies: Dict[str, List[str]] = {
+            name: list(program_config.get("depends_on", [])) for name, program_config in programs.items()
+        }
+        self.dependents: Dict[str, List[str]] = {name: [] for name in programs}
+        for name, dependencies in self.dependencies.items():
+            for dependency in dependencies:
+                if dependency in self.dependents:
+                    self.dependents[dependency].append(name)
+
+    def unknown_dependencies(self) -> Dict[str, List[str]]:
+        unknown = {}
+        for name, dependencies in self.dependencies.items():
+            missing = [dependency for dependency in dependencies if dependency not in self.dependencies]
+            if missing:
+                unknown[name] = missing
+        return unknown
+
+    def find_cycle(self) -> Optional[List[str]]:
+        visited = set()
+        for root in self.dependencies:
+            if root in visited:
+                continue
+            path = [root]
+            on_path = {root}
+            stack = [iter(self.dependencies[root])]
+            visited.add(root)
+            while stack:
+                dependency = next(stack[-1], None)
+                if dependency is None:
+                    stack.pop()
+                    on_path.discard(path.pop())
+                    continue
+                if dependency in on_path:
+                    return path[path.index(dependency):] + [dependency]
+                if dependency in visited or dependency not in self.dependencies:
+                    continue
+                visited.add(dependency)
+                path.append(dependency)
+                on_path.add(dependency)
+                stack.append(iter(self.dependencies[dependency]))
+        return None
+
+    def stop_waves(self, names: Iterable[str]) -> List[List[str]]:
+        remaining = set(names)
+        waves = []
+        while remaining:
+            wave = sorted(
+                name for name in remaining
+                if not any(dependent in remaining for dependent in self.dependents.get(name, []))
+            )
+            if not wave:
+                wave = sorted(remaining)
+            waves.append(wave)
+            remaining.difference_update(wave)
+        return waves
@@ -0,0 +1,193 @@
+import heapq
+import itertools
+import logging
+import os
+import selectors
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import Metrics
+
+
+ExitCallback = Callable[[int, Optional[int]], None]
+
+
+class Timer:
+    def __init__(self, when: float, callback: Callable[[], None]):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EventLoop:
+    LIVENESS_INTERVAL = 1.0
+
+    def __init__(self, logger: logging.Logger, metrics: Optional[Metrics] = None):
+        self.logger = logger
+        self.metrics = metrics or Metrics()
+        self.selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[int, ExitCallback, bool]] = []
+        self._watched: Dict[int, Tuple[ExitCallback, Optional[int], bool]] = {}
+        self._timers: List[Tuple[float, int, Timer]] = []
+        self._timer_sequence = itertools.count()
+        self._use_pidfd = self._pidfd_supported()
+        self._running = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _pidfd_supported() -> bool:
+        if not hasattr(os, "pidfd_open"):
+            return False
+        try:
+            os.close(os.pidfd_open(os.getpid()))
+            return True
+        except OSError:
+            return False
+
+    @property
+    def is_running(self) -> bool:
+        return self._running.is_set()
+
+    def start(self):
+        if not self._use_pidfd:
+            signal.signal(signal.SIGCHLD, self._sigchld_handler)
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="taskmaster-event-loop", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Event loop started ({'pidfd' if self._use_pidfd else 'SIGCHLD'} reaper)")
+
+    def stop(self):
+        self._running.clear()
+        self.wakeup()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def watch(self, pid: int, callback: ExitCallback, child: bool = True):
+        with self._lock:
+            self._pending.append((pid, callback, child))
+        self.wakeup()
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> Timer:
+        timer = Timer(time.monotonic() + delay, callback)
+        with self._lock:
+            heapq.heappush(self._timers, (timer.when, next(self._timer_sequence), timer))
+        self.wakeup()
+        return timer
+
+    def run_timers(self):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._timers or self._timers[0][0] > now:
+                    return
+                _, _, timer = heapq.heappop(self._timers)
+            if timer.cancelled:
+                continue
+            lag = max(0.0, time.monotonic() - timer.when)
+            self.metrics.observe("taskmaster_loop_lag_seconds", lag)
+            self.metrics.set_max("taskmaster_loop_lag_max_seconds", lag)
+            try:
+                timer.callback()
+            except Exception as e:
+                self.logger.error(f"Timer callback failed: {e}")
+
+    def _next_timeout(self) -> Optional[float]:
+        with self._lock:
+            timeout = None
+            if self._timers:
+                timeout = max(0.0, self._timers[0][0] - time.monotonic())
+        if not self._use_pidfd and any(not child for _, _, child in self._watched.values()):
+            timeout = self.LIVENESS_INTERVAL if timeout is None else min(timeout, self.LIVENESS_INTERVAL)
+        return timeout
+
+    @staticmethod
+    def is_alive(pid: int) -> bool:
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as stat:
+                return stat.read().rsplit(b")", 1)[1].split()[0] != b"Z"
+        except (OSError, IndexError):
+            return False
+
+    def wakeup(self):
+        try:
+            os.write(self._wakeup_w, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _sigchld_handler(self, signum, frame):
+        self.wakeup()
+
+    def _drain_wakeup(self):
+        try:
+            while os.read(self._wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _register_pending(self) -> List[int]:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        candidates = []
+        for pid, callback, child in pending:
+            pidfd = None
+            if self._use_pidfd:
+                try:
+                    pidfd = os.pidfd_open(pid)
+                    self.selector.register(pidfd, selectors.EVENT_READ, pid)
+                except ProcessLookupError:
+                    pidfd = None
+            self._watched[pid] = (callback, pidfd, child)
+            if child or pidfd is None:
+                candidates.append(pid)
+        return candidates
+
+    def _run(self):
+        while self._running.is_set():
+            candidates = []
+            for key, _ in self.selector.select(self._next_timeout()):
+                if key.fd == self._wakeup_r:
+                    self._drain_wakeup()
+                else:
+                    candidates.append(key.data)
+            candidates.extend(self._register_pending())
+            if not self._use_pidfd:
+                candidates = list(self._watched)
+            self._reap(candidates)
+            self.run_timers()
+
+    def _reap(self, pids: List[int]):
+        for pid in pids:
+            if pid not in self._watched:
+                continue
+            _, pidfd, child = self._watched[pid]
+            if child:
+                try:
+                    wpid, wstatus = os.waitpid(pid, os.WNOHANG)
+                    if wpid == 0:
+                        continue
+                    returncode = os.waitstatus_to_exitcode(wstatus)
+                except ChildProcessError:
+                    returncode = None
+            elif pidfd is None and self.is_alive(pid):
+                continue
+            else:
+                returncode = None
+            callback, pidfd, _ = self._watched.pop(pid)
+            if pidfd is not None:
+                self.selector.unregister(pidfd)
+                os.close(pidfd)
+            try:
+                callback(pid, returncode)
+            except Exception as e:
+                self.logger.error(f"Exit handler for PID {pid} failed: {e}")
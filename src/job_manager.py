@@ -0,0 +1,92 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, List, Optional
+
+
+class Job:
+    def __init__(self, job_id: int, description: str, total: int):
+        self.id = job_id
+        self.description = description
+        self.total = total
+        self.completed = 0
+        self.state = "pending"
+        self.error = None
+        self.created_at = time.monotonic()
+        self.finished_at = None
+        self.reported = False
+        self.future: Optional[Future] = None
+
+    def report(self, completed: int, total: int):
+        self.completed = completed
+        self.total = total
+
+    @property
+    def progress(self) -> str:
+        return f"{self.completed}/{self.total}"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.created_at
+
+
+class JobManager:
+    def __init__(self, max_workers: int = 4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="taskmaster-job")
+        self.jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def track(self, description: str, action: Callable[[Callable[[int, int], None]], None]) -> Job:
+        with self._lock:
+            job = Job(next(self._ids), description, 1)
+            self.jobs[job.id] = job
+        job.future = self.executor.submit(self._run, job, action)
+        return job
+
+    @staticmethod
+    def _run(job: Job, action: Callable[[Callable[[int, int], None]], None]):
+        job.state = "running"
+        try:
+            action(job.report)
+            job.completed = job.total
+            job.state = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.state = "failed"
+        finally:
+            job.finished_at = time.monotonic()
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.future.exception(timeout)
+        return job
+
+    def wait_all(self, timeout: Optional[float] = None):
+        for job in list(self.jobs.values()):
+            job.future.exception(timeout)
+
+    def collect_finished(self) -> List[Job]:
+        finished = []
+        with self._lock:
+            for job in self.jobs.values():
+                if job.is_finished and not job.reported:
+                    job.reported = True
+                    finished.append(job)
+        return finished
+
+    def has_unfinished(self) -> bool:
+        return any(not job.is_finished for job in list(self.jobs.values()))
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,15 +1,112 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import time
+from typing import Any, Dict, Optional
 
-def setup_logger():
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_ROTATE_INTERVALS = {"never": 0, "hourly": 3600, "daily": 86400, "weekly": 604800}
+DEFAULT_LOG_SETTINGS: Dict[str, Any] = {
+    "logfile": "taskmaster.log",
+    "loglevel": "INFO",
+    "logformat": "text",
+    "logmaxbytes": 10 * 1024 * 1024,
+    "logbackups": 5,
+    "logrotate": "never",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    def __init__(self, filename: str, max_bytes: int = 0, backups: int = 0, interval: int = 0):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+
+def _build_handler(settings: Dict[str, Any]) -> logging.Handler:
+    handler = RotatingFileHandler(
+        settings["logfile"],
+        max_bytes=settings["logmaxbytes"],
+        backups=settings["logbackups"],
+        interval=LOG_ROTATE_INTERVALS[settings["logrotate"]],
+    )
+    handler.setLevel(settings["loglevel"])
+    if settings["logformat"] == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def stop_logger():
+    global _listener
+    if _listener is not None:
+        _stop_listener(_listener)
+        _listener = None
+
+
+def _attach_listener(logger: logging.Logger, *handlers: logging.Handler) -> logging.handlers.QueueListener:
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return listener
+
+
+def restart_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = _attach_listener(logging.getLogger('taskmaster'), *_listener.handlers)
+
+
+def setup_logger(settings: Optional[Dict[str, Any]] = None) -> logging.Logger:
+    global _listener
+    settings = {**DEFAULT_LOG_SETTINGS, **(settings or {})}
     logger = logging.getLogger('taskmaster')
-    logger.setLevel(logging.INFO)
-    
-    file_handler = logging.FileHandler('taskmaster.log')
-    file_handler.setLevel(logging.INFO)
-    
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
-    
-    logger.addHandler(file_handler)
-    
-    return logger
\ No newline at end of file
+    logger.setLevel(settings["loglevel"])
+    logger.propagate = False
+
+    listener = _attach_listener(logger, _build_handler(settings))
+    previous_listener, _listener = _listener, listener
+    if previous_listener is not None:
+        _stop_listener(previous_listener)
+    return logger
+
+
+atexit.register(stop_logger)
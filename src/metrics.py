@@ -0,0 +1,155 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+METRICS: Dict[str, Tuple[str, str]] = {
+    "taskmaster_process_starts_total": ("counter", "Processes spawned."),
+    "taskmaster_process_restarts_total": ("counter", "Processes restarted automatically after exiting."),
+    "taskmaster_process_exits_total": ("counter", "Process exits by exit code."),
+    "taskmaster_process_fatal_total": ("counter", "Processes given up on after startretries attempts."),
+    "taskmaster_process_recycled_total": ("counter", "Processes restarted by a watchdog, by reason."),
+    "taskmaster_sigkill_total": ("counter", "Processes killed after not stopping within stoptime."),
+    "taskmaster_spawn_seconds": ("summary", "Time taken to spawn a process."),
+    "taskmaster_stop_seconds": ("summary", "Time taken to stop the processes of a program."),
+    "taskmaster_loop_lag_seconds": ("summary", "Delay between a timer's due time and when the event loop ran it."),
+    "taskmaster_loop_lag_max_seconds": ("gauge", "Largest event loop timer delay observed."),
+    "taskmaster_instance_up": ("gauge", "Whether the instance is running."),
+    "taskmaster_instance_uptime_seconds": ("gauge", "Time since the instance was started."),
+    "taskmaster_instance_restarts": ("gauge", "Automatic restarts of the instance slot."),
+    "taskmaster_instance_last_exit_code": ("gauge", "Exit code of the instance, if it has exited."),
+    "taskmaster_instance_cpu_seconds_total": ("counter", "User and system CPU time used by the instance."),
+    "taskmaster_instance_rss_bytes": ("gauge", "Resident memory of the instance."),
+    "taskmaster_instance_threads": ("gauge", "Threads in the instance."),
+    "taskmaster_instance_open_fds": ("gauge", "Open file descriptors of the instance."),
+    "taskmaster_program_cpu_seconds_total": ("counter", "CPU time used by all processes in the program's cgroup."),
+    "taskmaster_program_memory_bytes": ("gauge", "Memory charged to the program's cgroup."),
+}
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Labels], float] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> Tuple[str, Labels]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_max(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, value), value)
+
+    def observe(self, name: str, value: float, **labels):
+        sum_key = self._key(f"{name}_sum", labels)
+        count_key = self._key(f"{name}_count", labels)
+        with self._lock:
+            self._values[sum_key] = self._values.get(sum_key, 0) + value
+            self._values[count_key] = self._values.get(count_key, 0) + 1
+
+    def get(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(name, labels), 0)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        self._collectors.append(collector)
+
+    @staticmethod
+    def _family(sample_name: str) -> str:
+        for suffix in ("_sum", "_count"):
+            family = sample_name[:-len(suffix)]
+            if sample_name.endswith(suffix) and METRICS.get(family, ("",))[0] == "summary":
+                return family
+        return sample_name
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @classmethod
+    def _format_labels(cls, labels: Labels) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{cls._escape(value)}"' for key, value in labels) + "}"
+
+    def render(self) -> str:
+        with self._lock:
+            values = dict(self._values)
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                values[self._key(name, labels)] = value
+
+        families: Dict[str, List[str]] = {}
+        for (sample_name, labels), value in sorted(values.items()):
+            families.setdefault(self._family(sample_name), []).append(
+                f"{sample_name}{self._format_labels(labels)} {value}")
+        lines = []
+        for family, samples in families.items():
+            metric_type, description = METRICS.get(family, ("untyped", ""))
+            lines.append(f"# HELP {family} {description}")
+            lines.append(f"# TYPE {family} {metric_type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    def __init__(self, metrics: Metrics, address: str, port: int, logger: logging.Logger):
+        self.metrics = metrics
+        self.address = address
+        self.port = port
+        self.logger = logger
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.address, self.port), Handler)
+        except OSError as e:
+            self.logger.error(f"Failed to start metrics server on {self.address}:{self.port}: {e}")
+            return
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="taskmaster-metrics", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Metrics server listening on http://{self.address}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
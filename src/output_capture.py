@@ -0,0 +1,142 @@
+import logging
+import os
+import selectors
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ring_buffer import RingBuffer
+
+
+class RotatingLog:
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.references = 0
+        self._fd = None
+        self.size = 0
+        self._open()
+
+    def _open(self, truncate: bool = False):
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | os.O_CLOEXEC
+        if truncate:
+            flags |= os.O_TRUNC
+        self._fd = os.open(self.path, flags, 0o644)
+        self.size = os.fstat(self._fd).st_size
+
+    def write(self, data: bytes):
+        if self.max_bytes and self.size and self.size + len(data) > self.max_bytes:
+            self.rotate()
+        os.write(self._fd, data)
+        self.size += len(data)
+
+    def rotate(self):
+        os.close(self._fd)
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self._open(truncate=True)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class OutputCapture:
+    READ_SIZE = 65536
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[int, Optional[str], int, int, Optional[RingBuffer]]] = []
+        self._logs: Dict[str, RotatingLog] = {}
+        self._thread = None
+
+    @staticmethod
+    def instance_path(path: str, slot: int, numprocs: int) -> str:
+        if numprocs <= 1:
+            return path
+        root, extension = os.path.splitext(path)
+        return f"{root}.{slot}{extension}"
+
+    def pipe(self, path: Optional[str], max_bytes: int, backups: int, buffer: Optional[RingBuffer] = None) -> int:
+        read_fd, write_fd = os.pipe()
+        with self._lock:
+            self._pending.append((read_fd, path, max_bytes, backups, buffer))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="taskmaster-output", daemon=True)
+                self._thread.start()
+        self._wakeup()
+        return write_fd
+
+    def _wakeup(self):
+        try:
+            os.write(self._wakeup_w, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _register_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for read_fd, path, max_bytes, backups, buffer in pending:
+            log = None
+            if path is not None:
+                try:
+                    log = self._open_log(path, max_bytes, backups)
+                except OSError as e:
+                    self.logger.error(f"Failed to open output file {path}: {e}")
+            self.selector.register(read_fd, selectors.EVENT_READ, (log, buffer))
+
+    def _open_log(self, path: str, max_bytes: int, backups: int) -> RotatingLog:
+        log = self._logs.get(path)
+        if log is None:
+            log = self._logs[path] = RotatingLog(path, max_bytes, backups)
+        log.max_bytes = max_bytes
+        log.backups = backups
+        log.references += 1
+        return log
+
+    def _run(self):
+        while True:
+            for key, _ in self.selector.select():
+                if key.fd == self._wakeup_r:
+                    try:
+                        while os.read(self._wakeup_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    self._read(key.fd, *key.data)
+            self._register_pending()
+
+    def _read(self, fd: int, log: Optional[RotatingLog], buffer: Optional[RingBuffer]):
+        try:
+            data = os.read(fd, self.READ_SIZE)
+        except OSError:
+            data = b""
+        if data:
+            if buffer is not None:
+                buffer.write(data)
+            if log is not None:
+                try:
+                    log.write(data)
+                except OSError as e:
+                    self.logger.error(f"Failed to write output to {log.path}: {e}")
+            return
+        self.selector.unregister(fd)
+        os.close(fd)
+        if log is None:
+            return
+        log.references -= 1
+        if log.references == 0:
+            log.close()
+            del self._logs[log.path]
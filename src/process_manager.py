@@ -1,168 +1,1242 @@
+import hashlib
+import json
 import logging
 import subprocess
 import os
+import random
+import re
+import resource
+import shlex
 import signal
+import threading
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+from cgroups import CgroupManager
+from command_resolver import CommandResolver
+from dependency_graph import DependencyGraph
+from event_loop import EventLoop
+from metrics import Metrics
+from output_capture import OutputCapture
+from resource_sampler import ResourceSampler
+from ring_buffer import OutputBuffers, RingBuffer
+from state_file import AdoptedProcess, StateFile, proc_start_time
 
-class ProcessInfo:
-    def __init__(self, process: subprocess.Popen, cmd: str, config: dict):
-        self.process = process
+
+SHELL_METACHARACTERS = re.compile(r"[|&;<>()$`*?\[\]{}~#!\n]")
+RLIMITS = (("rlimit_nofile", resource.RLIMIT_NOFILE), ("rlimit_as", resource.RLIMIT_AS))
+EXITED = threading.Event()
+EXITED.set()
+
+
+class SpawnSpec:
+    def __init__(self, program_config: dict, command_resolver: CommandResolver):
+        self.cmd = program_config["cmd"]
+        self.env_source = dict(program_config.get("env", {}))
+        self.env = os.environ.copy()
+        self.env.update(self.env_source)
+        self.umask = int(program_config["umask"], 8)
+        self.args = self._exec_args(self.cmd, command_resolver)
+    
+    @staticmethod
+    def _exec_args(cmd: str, command_resolver: CommandResolver) -> Optional[List[str]]:
+        if SHELL_METACHARACTERS.search(cmd):
+            return None
+        try:
+            args = shlex.split(cmd)
+        except ValueError:
+            return None
+        if not args or "=" in args[0] or command_resolver.resolve(args[0]) is None:
+            return None
+        return args
+    
+    def matches(self, program_config: dict) -> bool:
+        return (self.cmd == program_config["cmd"] and self.umask == int(program_config["umask"], 8)
+                and self.env_source == program_config.get("env", {}))
+
+
+class StatusRecord:
+    __slots__ = ("program", "slot", "pid", "cmd", "state", "restarts", "start_time", "end_time", "exit_code",
+                 "cpu", "rss", "threads", "fds")
+    
+    def __init__(self, program: str, slot: int, pid: int, cmd: str, start_time: float):
+        self.program = program
+        self.slot = slot
+        self.pid = pid
         self.cmd = cmd
-        self.config = config
+        self.state = "STARTING"
         self.restarts = 0
-        self.start_time = time.monotonic()
+        self.start_time = start_time
         self.end_time = None
+        self.exit_code = None
+        self.set_sample(None)
+    
+    def set_sample(self, sample):
+        self.cpu = round(sample.cpu_percent, 1) if sample else None
+        self.rss = sample.rss_bytes if sample else None
+        self.threads = sample.threads if sample else None
+        self.fds = sample.fds if sample else None
+    
+    @property
+    def name(self) -> str:
+        return f"{self.program}:{self.slot:02d}"
+    
+    @property
+    def status(self) -> str:
+        return "running" if self.exit_code is None else "finished"
+    
+    @property
+    def uptime(self) -> float:
+        return (self.end_time or time.monotonic()) - self.start_time
+    
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "instance": self.slot,
+            "pid": self.pid,
+            "cmd": self.cmd,
+            "status": self.status,
+            "state": self.state,
+            "restarts": self.restarts,
+            "uptime": round(self.uptime, 3),
+            "exit_code": self.exit_code,
+            "cpu": self.cpu,
+            "rss": self.rss,
+            "threads": self.threads,
+            "fds": self.fds,
+        }
+
+
+class Progress:
+    __slots__ = ("callback", "total", "completed", "_lock")
+
+    def __init__(self, callback: Optional[Callable[[int, int], None]], total: int):
+        self.callback = callback
+        self.total = total
+        self.completed = 0
+        self._lock = threading.Lock()
+        if callback is not None:
+            callback(0, total)
+
+    def advance(self, count: int = 1):
+        if self.callback is None or not count:
+            return
+        with self._lock:
+            self.completed += count
+            self.callback(self.completed, self.total)
+
+
+class ProcessTable(dict):
+    def __init__(self):
+        super().__init__()
+        self.version = 0
+    
+    def __setitem__(self, program_name: str, process_infos: list):
+        super().__setitem__(program_name, process_infos)
+        self.version += 1
+    
+    def __delitem__(self, program_name: str):
+        super().__delitem__(program_name)
+        self.version += 1
+
+
+class ProcessInfo:
+    __slots__ = ("process", "record", "retries", "watched", "stopping", "rss_exceeded_since", "cgroup", "_exited")
+    _exited_lock = threading.Lock()
+    
+    def __init__(self, process: subprocess.Popen, program: str, cmd: str, slot: int = 0):
+        self.process = process
+        self.record = StatusRecord(program, slot, process.pid, cmd, time.monotonic())
+        self.retries = 0
+        self.watched = False
+        self.stopping = False
+        self.rss_exceeded_since = None
+        self.cgroup = None
+        self._exited = None
+    
+    @property
+    def program(self) -> str:
+        return self.record.program
+    
+    @property
+    def slot(self) -> int:
+        return self.record.slot
+    
+    @property
+    def name(self) -> str:
+        return self.record.name
+    
+    @property
+    def cmd(self) -> str:
+        return self.record.cmd
+    
+    @property
+    def start_time(self) -> float:
+        return self.record.start_time
+    
+    def poll(self):
+        if self.watched:
+            return self.process.returncode
+        return self.process.poll()
         
+    @property
+    def state(self) -> str:
+        return self.record.state
+    
+    @state.setter
+    def state(self, state: str):
+        self.record.state = state
+    
+    @property
+    def restarts(self) -> int:
+        return self.record.restarts
+    
+    @restarts.setter
+    def restarts(self, restarts: int):
+        self.record.restarts = restarts
+    
+    @property
+    def end_time(self) -> Optional[float]:
+        return self.record.end_time
+    
     def update_status(self):
-        if self.process.poll() is not None and self.end_time is None:
-	        self.end_time = time.monotonic()
+        returncode = self.poll()
+        if returncode is not None and self.record.end_time is None:
+            self.record.end_time = time.monotonic()
+            self.record.exit_code = returncode
+    
+    def mark_exited(self):
+        with self._exited_lock:
+            if self._exited is None:
+                self._exited = EXITED
+                return
+        self._exited.set()
+    
+    def _exit_event(self) -> threading.Event:
+        with self._exited_lock:
+            if self._exited is None:
+                self._exited = threading.Event()
+            return self._exited
+    
+    def wait(self, deadline: float) -> bool:
+        exited = self._exit_event()
+        while self.poll() is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            exited.wait(remaining if self.watched else min(remaining, 0.05))
+        return True
     
     @property
     def status(self):
-        return "running" if self.process.poll() is None else "finished"
+        return "running" if self.poll() is None else "finished"
     
     @property
     def uptime(self):
-        if self.end_time:
-	        return self.end_time - self.start_time
-        return time.monotonic() - self.start_time
+        return self.record.uptime
 
 
 class ProcessManager:
-	def __init__(self, config: dict, logger: logging.Logger):
+	SUPERVISOR_FIELDS = {
+		"autostart", "autorestart", "exitcodes", "startretries", "starttime", "stopsignal", "stoptime", "restartbatch",
+		"priority", "depends_on", "maxbytes", "backups", "max_rss", "max_rss_grace",
+		"cpu_max", "memory_max"
+	}
+	BACKOFF_BASE = 1
+	BACKOFF_MAX = 60
+	MIN_HEALTHY_TIME = 1
+	DEFAULT_MAX_SPAWNS = 16
+	DEFAULT_PRIORITY = 999
+	DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+	DEFAULT_BACKUPS = 5
+	DEFAULT_TAIL_MEMORY = 16 * 1024 * 1024
+	DEFAULT_SAMPLE_INTERVAL = 5
+	DEFAULT_MAX_RSS_GRACE = 10
+	
+	def __init__(self, config: dict, logger: logging.Logger, event_loop: Optional[EventLoop] = None,
+	             metrics: Optional[Metrics] = None):
 		self.config = config
 		self.logger = logger
-		self.processes = {}
+		self.metrics = metrics or Metrics()
+		self.event_loop = event_loop or EventLoop(logger, self.metrics)
+		self.command_resolver = CommandResolver()
+		self.processes: Dict[str, List[ProcessInfo]] = ProcessTable()
+		self._table_lock = threading.Lock()
+		self._snapshot_cache: List[Tuple[str, List[ProcessInfo]]] = []
+		self._snapshot_version = 0
+		self._program_locks: Dict[str, threading.RLock] = {}
+		self._spawn_specs: Dict[str, SpawnSpec] = {}
+		self._spawn_pool = None
+		self._spawn_pool_size = 0
+		self.output_capture = OutputCapture(logger)
+		self.output_buffers = OutputBuffers(self._tail_memory(config))
+		self.metrics.add_collector(self._instance_metrics)
+		self.metrics.add_collector(self._program_metrics)
+		self.resource_sampler = ResourceSampler()
+		self._sampling = False
+		self.cgroups = CgroupManager(config.get("taskmaster", {}).get("cgroup"), logger)
+		self.state_file = None
+		self._config_hashes: Dict[str, Tuple[dict, str]] = {}
+		self._proc_starts: Dict[int, Optional[int]] = {}
+		self._configure_state_file(config)
   
-	def start_initial_processes(self):
-		for program_name, program_config in self.config["programs"].items():
-			if program_config["autostart"]:
-				self.start_program(program_name)
+	def _program_lock(self, program_name: str) -> threading.RLock:
+		with self._table_lock:
+			lock = self._program_locks.get(program_name)
+			if lock is None:
+				lock = self._program_locks[program_name] = threading.RLock()
+			return lock
 	
-	def start_program(self, program_name: str):
-		if program_name not in self.config["programs"]:
-			self.logger.warning(f"Program {program_name} not found in config")
-			return
-		program_config = self.config["programs"][program_name]
+	@contextmanager
+	def _locked(self, program_names: List[str]):
+		with ExitStack() as stack:
+			for program_name in sorted(set(program_names)):
+				stack.enter_context(self._program_lock(program_name))
+			yield
+	
+	def _snapshot(self) -> List[Tuple[str, List[ProcessInfo]]]:
+		with self._table_lock:
+			if self._snapshot_version != self.processes.version:
+				self._snapshot_cache = list(self.processes.items())
+				self._snapshot_version = self.processes.version
+			return self._snapshot_cache
+	
+	def _claim(self, program_name: str, start: int = 0, end: Optional[int] = None) -> List[ProcessInfo]:
+		with self._table_lock:
+			process_infos = self.processes.get(program_name, [])[start:end]
+			for process_info in process_infos:
+				process_info.stopping = True
+			return process_infos
+	
+	def _replace_processes(self, program_name: str, replacements: List[Tuple[ProcessInfo, ProcessInfo]],
+	                       require_active: bool = True) -> bool:
+		with self._table_lock:
+			process_infos = self.processes.get(program_name)
+			if process_infos is None:
+				return False
+			indexes = [self._index_of(process_infos, old_process_info) for old_process_info, _ in replacements]
+			for index, (old_process_info, _) in zip(indexes, replacements):
+				if index is None or (require_active and old_process_info.stopping):
+					return False
+			for index, (_, new_process_info) in zip(indexes, replacements):
+				process_infos[index] = new_process_info
+		self._persist()
+		return True
+	
+	@staticmethod
+	def _index_of(process_infos: List[ProcessInfo], process_info: ProcessInfo) -> Optional[int]:
+		slot = process_info.slot
+		if slot < len(process_infos) and process_infos[slot] is process_info:
+			return slot
+		for index, candidate in enumerate(process_infos):
+			if candidate is process_info:
+				return index
+		return None
+	
+	def _is_current(self, program_name: str, process_info: ProcessInfo) -> bool:
+		return self._index_of(self.processes.get(program_name, []), process_info) is not None
+	
+	def _configure_state_file(self, config: dict):
+		path = config.get("taskmaster", {}).get("statefile")
+		if path != (self.state_file.path if self.state_file else None):
+			self.state_file = StateFile(path, self.logger, self._state) if path else None
+	
+	def _persist(self):
+		if self.state_file is not None:
+			self.state_file.mark_dirty()
+	
+	def flush_state(self):
+		if self.state_file is not None:
+			self.state_file.flush()
+	
+	def _config_hash(self, program_name: str, program_config: dict) -> str:
+		cached = self._config_hashes.get(program_name)
+		if cached is None or cached[0] is not program_config:
+			digest = hashlib.sha256(json.dumps(program_config, sort_keys=True, default=str).encode()).hexdigest()
+			cached = self._config_hashes[program_name] = (program_config, digest)
+		return cached[1]
+	
+	def _state(self) -> dict:
+		programs = {}
+		proc_starts = {}
+		for program_name, process_infos in self._snapshot():
+			program_config = self.config["programs"].get(program_name)
+			if program_config is None:
+				continue
+			instances = []
+			for process_info in process_infos:
+				record = process_info.record
+				if record.exit_code is not None or process_info.stopping:
+					continue
+				if record.pid not in self._proc_starts:
+					self._proc_starts[record.pid] = proc_start_time(record.pid)
+				proc_starts[record.pid] = self._proc_starts[record.pid]
+				instances.append({
+					"slot": record.slot,
+					"pid": record.pid,
+					"proc_start": proc_starts[record.pid],
+					"start_time": record.start_time,
+					"restarts": record.restarts,
+					"cgroup": process_info.cgroup,
+				})
+			programs[program_name] = {"config_hash": self._config_hash(program_name, program_config), "instances": instances}
+		self._proc_starts = proc_starts
+		return {"pid": os.getpid(), "programs": programs}
+	
+	def _adopt_processes(self) -> set:
+		if self.state_file is None:
+			return set()
+		state = self.state_file.load()
+		supervisor_pid = state.get("pid")
+		if supervisor_pid not in (None, os.getpid()) and EventLoop.is_alive(supervisor_pid):
+			self.logger.warning(f"Supervisor {supervisor_pid} from {self.state_file.path} is still running, not adopting its processes")
+			return set()
+		adopted = set()
+		for program_name, program_state in state.get("programs", {}).items():
+			living = [
+				instance for instance in program_state.get("instances", [])
+				if instance.get("proc_start") is not None and proc_start_time(instance["pid"]) == instance["proc_start"]
+			]
+			if not living:
+				continue
+			program_config = self.config["programs"].get(program_name)
+			reason = None
+			if program_config is None:
+				reason = "it was removed from the configuration"
+			elif program_state.get("config_hash") != self._config_hash(program_name, program_config):
+				reason = "its configuration changed"
+			elif self._pipes_output(program_config):
+				reason = "its output pipes were lost with the previous supervisor"
+			if reason is not None:
+				self._stop_orphans(program_name, program_config, living, reason)
+				continue
+			self._adopt_program(program_name, program_config, living)
+			adopted.add(program_name)
+		self._persist()
+		return adopted
+	
+	def _stop_orphans(self, program_name: str, program_config: Optional[dict], instances: List[dict], reason: str):
+		stop_signal = getattr(signal, f"SIG{program_config['stopsignal']}") if program_config else signal.SIGTERM
+		self.logger.warning(f"Stopping {len(instances)} leftover processes of {program_name}: {reason}")
+		for instance in instances:
+			AdoptedProcess(instance["pid"], instance["proc_start"]).send_signal(stop_signal)
+	
+	def _adopt_program(self, program_name: str, program_config: dict, instances: List[dict]):
 		num_processes = program_config["numprocs"]
-		
+		surplus = [instance for instance in instances if instance["slot"] >= num_processes]
+		if surplus:
+			self._stop_orphans(program_name, program_config, surplus, "numprocs was lowered")
 		process_list = []
-		for _ in range(num_processes):
-			process_info = self._create_process_info(program_name, program_config)
+		for instance in sorted(instances, key=lambda instance: instance["slot"]):
+			if instance["slot"] >= num_processes:
+				continue
+			process_info = ProcessInfo(
+				AdoptedProcess(instance["pid"], instance["proc_start"]), program_name, program_config["cmd"], instance["slot"])
+			process_info.record.start_time = instance["start_time"]
+			process_info.restarts = instance["restarts"]
+			process_info.state = "RUNNING"
+			if instance.get("cgroup") and os.path.isdir(instance["cgroup"]):
+				process_info.cgroup = instance["cgroup"]
+			self._watch(program_name, process_info)
 			process_list.append(process_info)
-
-		self.processes[program_name] = process_list
-		self.logger.info(f"Started program: {program_name}")
+		adopted_slots = {process_info.slot for process_info in process_list}
+		missing_slots = [slot for slot in range(num_processes) if slot not in adopted_slots]
+		adopted_count = len(process_list)
+		if missing_slots:
+			with self._open_output(program_config) as output:
+				futures = self._submit_spawns(program_name, program_config, missing_slots, output)
+				for future in futures:
+					try:
+						process_list.append(future.result())
+					except Exception as e:
+						self.logger.error(f"Failed to start process for program {program_name}: {e}")
+			process_list.sort(key=lambda process_info: process_info.slot)
+		with self._table_lock:
+			self.processes[program_name] = process_list
+		self.logger.info(
+			f"Adopted {adopted_count} running processes of {program_name}, "
+			f"started {len(process_list) - adopted_count}")
 	
-	def _create_process_info(self, program_name: str, program_config: dict) -> ProcessInfo:
-		process = self._start_process(program_name, program_config)
-		return ProcessInfo(process, program_config["cmd"], program_config)
+	def start_initial_processes(self):
+		started_at = time.monotonic()
+		adopted = self._adopt_processes()
+		program_names = [
+			name for name, program_config in self.config["programs"].items()
+			if program_config["autostart"] and name not in adopted
+		]
+		self.start_in_dependency_order(program_names)
+		num_processes = sum(len(self.processes.get(name, [])) for name in program_names)
+		self.logger.info(
+			f"Started {num_processes} processes for {len(program_names)} programs "
+			f"in {time.monotonic() - started_at:.3f} seconds")
 	
-	def _start_process(self, program_name: str, program_config: dict) -> subprocess.Popen:
-		env = os.environ.copy()
-		env.update(program_config.get("env", {}))
-		
-		umask = int(program_config["umask"], 8)
-		old_umask = os.umask(umask)
+	def start_in_dependency_order(self, program_names: List[str], progress: Optional[Callable[[int, int], None]] = None):
+		tracker = Progress(progress, len(program_names))
+		graph = DependencyGraph(self.config["programs"])
+		pending = set(program_names)
+		blocked_by = {
+			name: {dependency for dependency in graph.dependencies.get(name, []) if dependency in pending}
+			for name in pending
+		}
+		ready = [name for name in pending if not blocked_by[name]]
+		waiting: Dict[Future, str] = {}
+		with ThreadPoolExecutor(thread_name_prefix="taskmaster-depends") as waiters:
+			while ready or waiting:
+				ready.sort(key=self._priority)
+				self.start_programs(ready, tracker)
+				pending.difference_update(ready)
+				for program_name in ready:
+					if any(dependent in pending for dependent in graph.dependents.get(program_name, [])):
+						waiting[waiters.submit(self._wait_running, program_name)] = program_name
+				ready = []
+				if not waiting:
+					break
+				done, _ = wait(list(waiting), return_when=FIRST_COMPLETED)
+				for future in done:
+					program_name = waiting.pop(future)
+					if not future.result():
+						self.logger.error(f"Program {program_name} did not reach RUNNING state, not starting its dependents")
+						continue
+					for dependent in graph.dependents.get(program_name, []):
+						if dependent in pending:
+							blocked_by[dependent].discard(program_name)
+							if not blocked_by[dependent]:
+								ready.append(dependent)
+		for program_name in pending:
+			self.logger.warning(f"Program {program_name} was not started: dependencies are not running")
+			print(f"Program {program_name} was not started: dependencies are not running")
+		tracker.advance(len(pending))
+	
+	def _priority(self, program_name: str) -> int:
+		return self.config["programs"][program_name].get("priority", self.DEFAULT_PRIORITY)
+	
+	def _wait_running(self, program_name: str) -> bool:
+		process_infos = self.processes.get(program_name)
+		if not process_infos:
+			return False
+		return self._wait_healthy(process_infos, self.config["programs"][program_name]["starttime"])
+	
+	def start_program(self, program_name: str):
+		self.start_programs([program_name])
+	
+	def start_programs(self, program_names: List[str], tracker: Optional[Progress] = None):
+		with self._locked(program_names):
+			self._start_programs(program_names, tracker)
+	
+	def _start_programs(self, program_names: List[str], tracker: Optional[Progress] = None):
+		tracker = tracker or Progress(None, len(program_names))
+		max_spawns = self._max_spawns()
+		in_flight = deque()
 		try:
-			with open(program_config["stdout"], "w") as stdout, open(program_config["stderr"], "w") as stderr:
-				process = subprocess.Popen(
-					program_config['cmd'],
-					shell=True,
-					stdout=stdout,
-					stderr=stderr,
-					env=env,
-					cwd=program_config["workingdir"],
-				)
-			
-			self.logger.info(f"Started process {process.pid} for program {program_name} with umask {umask:03o}")
-			return process
+			for program_name in program_names:
+				if program_name not in self.config["programs"]:
+					self.logger.warning(f"Program {program_name} not found in config")
+					tracker.advance()
+					continue
+				if any(process_info.poll() is None for process_info in self.processes.get(program_name, [])):
+					self.logger.warning(f"Program {program_name} is already running")
+					print(f"Program {program_name} is already running")
+					tracker.advance()
+					continue
+				program_config = self.config["programs"][program_name]
+				outputs = ExitStack()
+				try:
+					output = outputs.enter_context(self._open_output(program_config))
+				except OSError as e:
+					self.logger.error(f"Failed to start program {program_name}: {e}")
+					print(f"Failed to start program {program_name}: {e}")
+					tracker.advance()
+					continue
+				futures = self._submit_spawns(program_name, program_config, range(program_config["numprocs"]), output)
+				in_flight.append((program_name, futures, outputs))
+				if len(in_flight) > max_spawns:
+					self._finish_start(*in_flight.popleft())
+					tracker.advance()
 		finally:
-			os.umask(old_umask)
-			
-	def stop_program(self, program_name: str):
-		if program_name not in self.processes:
-			self.logger(f"Process with {program_name} is not running")
-			print(f"Process with {program_name} is not running")
+			while in_flight:
+				self._finish_start(*in_flight.popleft())
+				tracker.advance()
+	
+	def _finish_start(self, program_name: str, futures: List[Future], outputs: ExitStack):
+		with outputs:
+			process_list = []
+			for future in futures:
+				try:
+					process_list.append(future.result())
+				except Exception as e:
+					self.logger.error(f"Failed to start process for program {program_name}: {e}")
+					print(f"Failed to start process for program {program_name}: {e}")
+		if process_list:
+			with self._table_lock:
+				self.processes[program_name] = process_list
+			self._persist()
+			self.logger.info(f"Started program: {program_name}")
+	
+	def _max_spawns(self) -> int:
+		return self.config.get("taskmaster", {}).get("maxspawns", self.DEFAULT_MAX_SPAWNS)
+	
+	@classmethod
+	def _tail_memory(cls, config: dict) -> int:
+		return config.get("taskmaster", {}).get("tailmemory", cls.DEFAULT_TAIL_MEMORY)
+	
+	def _sample_interval(self) -> float:
+		return self.config.get("taskmaster", {}).get("sampleinterval", self.DEFAULT_SAMPLE_INTERVAL)
+	
+	def start_sampling(self):
+		if self._sampling or not self._sample_interval() or not self.event_loop.is_running:
+			return
+		self._sampling = True
+		self.event_loop.call_later(0, self._sample_resources)
+	
+	def _sample_resources(self):
+		interval = self._sample_interval()
+		if not interval:
+			self._sampling = False
+			self.resource_sampler.close()
+			return
+		snapshot = self._snapshot()
+		self.resource_sampler.sample(
+			process_info.process.pid
+			for _, process_infos in snapshot
+			for process_info in process_infos
+			if process_info.poll() is None
+		)
+		for _, process_infos in snapshot:
+			for process_info in process_infos:
+				process_info.record.set_sample(self.resource_sampler.get(process_info.process.pid))
+		self._check_memory(snapshot)
+		self.event_loop.call_later(interval, self._sample_resources)
+	
+	def _check_memory(self, snapshot: List[Tuple[str, List[ProcessInfo]]]):
+		now = time.monotonic()
+		for program_name, process_infos in snapshot:
+			program_config = self.config["programs"].get(program_name, {})
+			max_rss = program_config.get("max_rss")
+			grace = program_config.get("max_rss_grace", self.DEFAULT_MAX_RSS_GRACE)
+			for process_info in process_infos:
+				sample = self.resource_sampler.get(process_info.process.pid)
+				if not max_rss or sample is None or process_info.stopping or sample.rss_bytes <= max_rss:
+					process_info.rss_exceeded_since = None
+					continue
+				if process_info.rss_exceeded_since is None:
+					process_info.rss_exceeded_since = now
+					self.logger.warning(
+						f"Process {process_info.process.pid} of {process_info.name} uses {sample.rss_bytes} bytes, "
+						f"above max_rss {max_rss}")
+				if now - process_info.rss_exceeded_since >= grace:
+					process_info.rss_exceeded_since = None
+					threading.Thread(
+						target=self._recycle_process, args=(program_name, process_info, "max_rss"), daemon=True
+					).start()
+	
+	def _recycle_process(self, program_name: str, process_info: ProcessInfo, reason: str):
+		with self._program_lock(program_name):
+			with self._table_lock:
+				if process_info.stopping or not self._is_current(program_name, process_info):
+					return
+				process_info.stopping = True
+			self.logger.info(f"Restarting process {process_info.process.pid} of {process_info.name} ({reason})")
+			self._stop_processes({program_name: [process_info]})
+			program_config = self.config["programs"][program_name]
+			self.metrics.inc("taskmaster_process_recycled_total", program=program_name, reason=reason)
+			try:
+				new_process_info = self._create_process_info(program_name, program_config, process_info.slot)
+			except Exception as e:
+				self.logger.error(f"Failed to restart process {process_info.name} ({reason}): {e}")
+				process_info.stopping = False
+				self._handle_exit(program_name, process_info)
+				return
+			new_process_info.restarts = process_info.restarts + 1
+			self._replace_processes(program_name, [(process_info, new_process_info)], require_active=False)
+	
+	def _submit_spawns(self, program_name: str, program_config: dict, slots: Iterable[int], output) -> List[Future]:
+		max_spawns = self._max_spawns()
+		if self._spawn_pool is None or self._spawn_pool_size != max_spawns:
+			if self._spawn_pool is not None:
+				self._spawn_pool.shutdown(wait=False)
+			self._spawn_pool = ThreadPoolExecutor(max_workers=max_spawns, thread_name_prefix="taskmaster-spawn")
+			self._spawn_pool_size = max_spawns
+		self._spawn_spec(program_name, program_config)
+		return [
+			self._spawn_pool.submit(self._create_process_info, program_name, program_config, slot, output)
+			for slot in slots
+		]
+	
+	def _create_process_info(self, program_name: str, program_config: dict, slot: int = 0, output=None) -> ProcessInfo:
+		cgroup = self.cgroups.prepare(program_name, slot, program_config)
+		process = self._start_process(program_name, program_config, slot, output, cgroup)
+		process_info = ProcessInfo(process, program_name, program_config["cmd"], slot)
+		if cgroup is not None and self.cgroups.attach(cgroup, process.pid):
+			process_info.cgroup = cgroup
+		self._watch(program_name, process_info)
+		if program_config["starttime"] == 0:
+			process_info.state = "RUNNING"
+		self.event_loop.call_later(
+			max(program_config["starttime"], self.MIN_HEALTHY_TIME),
+			lambda: self._confirm_running(program_name, process_info)
+		)
+		return process_info
+	
+	def _confirm_running(self, program_name: str, process_info: ProcessInfo):
+		if process_info.state not in ("STARTING", "RUNNING") or process_info.poll() is not None:
+			return
+		if process_info.state == "STARTING":
+			process_info.state = "RUNNING"
+			self.logger.info(f"Process {process_info.process.pid} of {process_info.name} entered RUNNING state")
+		process_info.retries = 0
+	
+	def _watch(self, program_name: str, process_info: ProcessInfo):
+		if not self.event_loop.is_running:
+			return
+		process_info.watched = True
+		self.event_loop.watch(
+			process_info.process.pid,
+			lambda pid, returncode: self._on_process_exit(program_name, process_info, returncode),
+			child=not isinstance(process_info.process, AdoptedProcess)
+		)
+	
+	def _on_process_exit(self, program_name: str, process_info: ProcessInfo, returncode: Optional[int]):
+		if process_info.process.returncode is None:
+			process_info.process.returncode = returncode if returncode is not None else -1
+		process_info.update_status()
+		process_info.mark_exited()
+		self._persist()
+		self.metrics.inc("taskmaster_process_exits_total", program=program_name, code=process_info.process.returncode)
+		self.logger.info(
+			f"Process {process_info.process.pid} of {process_info.name} exited with code {process_info.process.returncode}")
+		if process_info.stopping or not self._is_current(program_name, process_info):
+			return
+		self._handle_exit(program_name, process_info)
+	
+	def _handle_exit(self, program_name: str, process_info: ProcessInfo):
+		if process_info.cgroup is not None:
+			self.cgroups.kill(process_info.cgroup)
+		program_config = self.config["programs"].get(program_name)
+		if program_config is None:
 			return
+		if not self._should_restart(program_config, process_info):
+			process_info.state = "EXITED"
+			return
+		if process_info.retries >= program_config["startretries"]:
+			process_info.state = "FATAL"
+			self.metrics.inc("taskmaster_process_fatal_total", program=program_name)
+			self.logger.warning(f"Failed to restart {program_name} after {program_config['startretries']} attempts")
+			return
+		process_info.retries += 1
+		delay = self._backoff_delay(process_info.retries)
+		if delay == 0:
+			self._restart_process(program_name, process_info)
+			return
+		process_info.state = "BACKOFF"
+		self.logger.info(
+			f"Restarting process {process_info.name} in {delay:.1f} seconds (attempt {process_info.retries})")
+		self.event_loop.call_later(delay, lambda: self._restart_process(program_name, process_info))
+	
+	def _backoff_delay(self, retries: int) -> float:
+		if retries <= 1:
+			return 0
+		delay = min(self.BACKOFF_BASE * 2 ** (retries - 2), self.BACKOFF_MAX)
+		return random.uniform(delay / 2, delay)
+	
+	@staticmethod
+	def _pipes_output(program_config: dict) -> bool:
+		return bool(program_config.get("capture") or program_config.get("tailbytes"))
+	
+	@classmethod
+	@contextmanager
+	def _open_output(cls, program_config: dict):
+		if cls._pipes_output(program_config):
+			yield None
+			return
+		with open(program_config["stdout"], "w") as stdout, open(program_config["stderr"], "w") as stderr:
+			yield stdout, stderr
+	
+	@contextmanager
+	def _instance_output(self, program_name: str, program_config: dict, slot: int):
+		if not self._pipes_output(program_config):
+			with self._open_output(program_config) as output:
+				yield output
+			return
+		buffer = None
+		if program_config.get("tailbytes"):
+			buffer = self.output_buffers.get(program_name, slot, program_config["tailbytes"])
+		with ExitStack() as pipes:
+			output = []
+			for stream in ("stdout", "stderr"):
+				write_fd = self._output_pipe(program_config, stream, slot, buffer)
+				if write_fd != subprocess.DEVNULL:
+					pipes.callback(os.close, write_fd)
+				output.append(write_fd)
+			yield tuple(output)
+	
+	def _output_pipe(self, program_config: dict, stream: str, slot: int, buffer: Optional[RingBuffer]):
+		path = program_config[stream]
+		if path == os.devnull:
+			path = None
+		if path is None and buffer is None:
+			return subprocess.DEVNULL
+		if path is not None and program_config.get("capture"):
+			path = OutputCapture.instance_path(path, slot, program_config["numprocs"])
+		return self.output_capture.pipe(
+			path,
+			program_config.get("maxbytes", self.DEFAULT_MAX_BYTES),
+			program_config.get("backups", self.DEFAULT_BACKUPS),
+			buffer
+		)
+	
+	def tail(self, program_name: str, offsets: Optional[Dict[int, int]] = None) -> Dict[int, Tuple[int, bytes]]:
+		return self.output_buffers.read(program_name, offsets)
+	
+	def _spawn_spec(self, program_name: str, program_config: dict) -> SpawnSpec:
+		spawn_spec = self._spawn_specs.get(program_name)
+		if spawn_spec is None or not spawn_spec.matches(program_config):
+			spawn_spec = SpawnSpec(program_config, self.command_resolver)
+			self._spawn_specs[program_name] = spawn_spec
+		return spawn_spec
+	
+	def _start_process(self, program_name: str, program_config: dict, slot: int = 0, output=None,
+	                   cgroup: Optional[str] = None) -> subprocess.Popen:
+		if output is None:
+			with self._instance_output(program_name, program_config, slot) as output:
+				return self._start_process(program_name, program_config, slot, output, cgroup)
 		
-		program_config = self.config["programs"][program_name]
-		stop_signal = getattr(signal, f"SIG{program_config['stopsignal']}")
+		spawn_spec = self._spawn_spec(program_name, program_config)
+		stdout, stderr = output
+		args, shell = spawn_spec.args or spawn_spec.cmd, spawn_spec.args is None
+		if cgroup is not None:
+			args, shell = self.cgroups.command(cgroup, spawn_spec.args or ["/bin/sh", "-c", spawn_spec.cmd]), False
+		spawn_started = time.monotonic()
+		process = subprocess.Popen(
+			args,
+			shell=shell,
+			stdout=stdout,
+			stderr=stderr,
+			env=spawn_spec.env,
+			cwd=program_config["workingdir"],
+			umask=spawn_spec.umask,
+			preexec_fn=self._limits_preexec(program_config),
+		)
+		self._check_limits(program_name, process.pid, program_config)
+		self.metrics.observe("taskmaster_spawn_seconds", time.monotonic() - spawn_started, program=program_name)
+		self.metrics.inc("taskmaster_process_starts_total", program=program_name)
 		
-		for process_info in self.processes[program_name]:
-			process_info.process.send_signal(stop_signal)
+		self.logger.info(
+			f"Started process {process.pid} for program {program_name} with umask {spawn_spec.umask:03o}")
+		return process
+			
+	@staticmethod
+	def _limits_preexec(program_config: dict) -> Optional[Callable[[], None]]:
+		rlimits = []
+		for key, limit in RLIMITS:
+			value = program_config.get(key)
+			if value is None:
+				continue
+			_, hard = resource.getrlimit(limit)
+			if hard != resource.RLIM_INFINITY and value > hard:
+				hard = value
+			rlimits.append((limit, (value, hard)))
+		affinity = program_config.get("cpu_affinity")
+		nice = program_config.get("nice")
+		if not rlimits and not affinity and nice is None:
+			return None
 		
-		time.sleep(program_config["stoptime"])
+		def apply_limits():
+			for limit, limits in rlimits:
+				try:
+					resource.setrlimit(limit, limits)
+				except (OSError, ValueError):
+					pass
+			try:
+				if affinity:
+					os.sched_setaffinity(0, affinity)
+			except OSError:
+				pass
+			try:
+				if nice is not None:
+					os.setpriority(os.PRIO_PROCESS, 0, nice)
+			except OSError:
+				pass
 		
-		for process_info in self.processes[program_name]:
-			if process_info.process.poll() is None:
-				process_info.process.kill()
-			process_info.update_status()
+		return apply_limits
+	
+	def _check_limits(self, program_name: str, pid: int, program_config: dict):
+		failed = []
+		try:
+			for key, limit in RLIMITS:
+				if program_config.get(key) is not None and resource.prlimit(pid, limit)[0] != program_config[key]:
+					failed.append(key)
+			if program_config.get("cpu_affinity") and os.sched_getaffinity(pid) != set(program_config["cpu_affinity"]):
+				failed.append("cpu_affinity")
+			if program_config.get("nice") is not None and os.getpriority(os.PRIO_PROCESS, pid) != program_config["nice"]:
+				failed.append("nice")
+		except OSError:
+			return
+		if failed:
+			self.logger.warning(f"Failed to apply {', '.join(failed)} to process {pid} of {program_name}")
+	
+	def stop_program(self, program_name: str):
+		self.stop_programs([program_name])
+	
+	def running_programs(self) -> List[str]:
+		return [program_name for program_name, _ in self._snapshot()]
+	
+	def stop_all_programs(self):
+		self.stop_in_dependency_order(self.running_programs())
+	
+	def stop_in_dependency_order(self, program_names: List[str], progress: Optional[Callable[[int, int], None]] = None):
+		tracker = Progress(progress, len(program_names))
+		graph = DependencyGraph(self.config["programs"])
+		for wave in graph.stop_waves(program_names):
+			self.stop_programs(wave, tracker)
+	
+	def stop_programs(self, program_names: List[str], tracker: Optional[Progress] = None):
+		with self._locked(program_names):
+			self._stop_programs(program_names, tracker)
+	
+	def _stop_programs(self, program_names: List[str], tracker: Optional[Progress] = None):
+		tracker = tracker or Progress(None, len(program_names))
+		targets = {}
+		for program_name in program_names:
+			if program_name in self.processes:
+				targets[program_name] = self._claim(program_name)
+			else:
+				self.logger.warning(f"Process with {program_name} is not running")
+				print(f"Process with {program_name} is not running")
+				tracker.advance()
 		
-		del self.processes[program_name]
-		print(f"Stopped program: {program_name}")
-		self.logger.info(f"Stopped program: {program_name}")
-	
-	def restart_all_programs(self):
-		for program_name in list(self.processes.keys()):
-			self.restart_program(program_name)
-	
-	def restart_program(self, program_name: str):
-		self.stop_program(program_name)
-		self.start_program(program_name)
-	
-	def get_status(self):
-		status = {}
-		for program_name, process_infos in self.processes.items():
-			status[program_name] = []
+		self._stop_processes(targets)
+		for program_name in targets:
+			with self._table_lock:
+				del self.processes[program_name]
+			self.cgroups.remove(program_name)
+			print(f"Stopped program: {program_name}")
+			self.logger.info(f"Stopped program: {program_name}")
+			tracker.advance()
+		self._persist()
+	
+	def _stop_processes(self, targets: Dict[str, List[ProcessInfo]]):
+		deadlines: Dict[str, float] = {}
+		stop_started = time.monotonic()
+		for program_name, process_infos in targets.items():
+			program_config = self.config["programs"][program_name]
+			stop_signal = getattr(signal, f"SIG{program_config['stopsignal']}")
 			for process_info in process_infos:
+				process_info.stopping = True
+				if process_info.cgroup is not None:
+					self.cgroups.signal(process_info.cgroup, stop_signal)
+				else:
+					process_info.process.send_signal(stop_signal)
+			deadlines[program_name] = time.monotonic() + program_config["stoptime"]
+		
+		for program_name, deadline in sorted(deadlines.items(), key=lambda item: item[1]):
+			for process_info in targets[program_name]:
+				stopped = process_info.wait(deadline) and (
+					process_info.cgroup is None or self.cgroups.wait_empty(process_info.cgroup, deadline))
+				if not stopped:
+					self.logger.warning(
+						f"Process {process_info.process.pid} of {process_info.name} did not stop in time, sending SIGKILL")
+					if process_info.cgroup is not None:
+						self.cgroups.kill(process_info.cgroup)
+					else:
+						process_info.process.kill()
+					self.metrics.inc("taskmaster_sigkill_total", program=program_name)
 				process_info.update_status()
-				status[program_name].append({
-					"pid": process_info.process.pid,
-					"cmd": process_info.cmd,
-					"status": process_info.status,
-					"restarts": process_info.restarts,
-					"uptime": f"{process_info.uptime:.3f}",
-				})
-		return status
+				process_info.state = "STOPPED"
+			self.metrics.observe("taskmaster_stop_seconds", time.monotonic() - stop_started, program=program_name)
 	
-	def update_config(self, new_config: dict):
-		old_programs = set(self.config["programs"].keys())
-		new_programs = set(new_config["programs"].keys())
+	def restart_all_programs(self, batch=None, progress: Optional[Callable[[int, int], None]] = None):
+		self.restart_programs(self.running_programs(), batch, progress)
+	
+	def restart_program(self, program_name: str, batch=None):
+		self.restart_programs([program_name], batch)
+	
+	def restart_programs(self, program_names: List[str], batch=None,
+	                     progress: Optional[Callable[[int, int], None]] = None):
+		tracker = Progress(progress, len(program_names))
+		rolling_programs = {}
+		for program_name in program_names:
+			program_config = self.config["programs"].get(program_name)
+			program_batch = batch if batch is not None else (program_config or {}).get("restartbatch")
+			if program_batch is not None and program_name in self.processes:
+				rolling_programs[program_name] = (program_batch, None)
 		
-		for program_name in old_programs - new_programs:
-			self.stop_program(program_name)
+		full_programs = [program_name for program_name in program_names if program_name not in rolling_programs]
+		with self._locked(full_programs):
+			self._stop_programs(full_programs)
+			self._start_programs(full_programs, tracker)
 		
-		for program_name in new_programs - old_programs:
-			if new_config["programs"][program_name]["autostart"]:
-				self.start_program(program_name)
+		self._rolling_restarts(rolling_programs, tracker)
+	
+	def _rolling_restarts(self, plans: Dict[str, Tuple[Any, Optional[int]]], tracker: Optional[Progress] = None):
+		tracker = tracker or Progress(None, len(plans))
+		failed = []
 		
-		for program_name in old_programs & new_programs:
-			if self.config["programs"][program_name] != new_config["programs"][program_name]:
-				self.restart_program(program_name)
+		def roll(program_name: str, batch, count: Optional[int]):
+			try:
+				restarted = self._rolling_restart(program_name, batch, count)
+			except Exception as e:
+				self.logger.error(f"Rolling restart of {program_name} failed: {e}")
+				restarted = False
+			if not restarted:
+				failed.append(program_name)
+			tracker.advance()
 		
-		self.config = new_config
+		threads = [
+			threading.Thread(target=roll, args=(program_name, batch, count))
+			for program_name, (batch, count) in plans.items()
+		]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		if failed:
+			raise RuntimeError(f"Rolling restart aborted for {', '.join(sorted(failed))}")
 	
-	def check_and_restart(self):
-		for program_name, process_infos in self.processes.items():
+	def _rolling_restart(self, program_name: str, batch, count: Optional[int] = None) -> bool:
+		with self._program_lock(program_name):
 			program_config = self.config["programs"][program_name]
-			for i, process_info in enumerate(process_infos):
+			batch_size = self._batch_size(batch, program_config["numprocs"])
+			if count is None:
+				count = len(self.processes.get(program_name, []))
+			self.logger.info(f"Rolling restart of {program_name} in batches of {batch_size}")
+			for offset in range(0, count, batch_size):
+				old_batch = self._claim(program_name, offset, min(offset + batch_size, count))
+				self._stop_processes({program_name: old_batch})
+				with self._open_output(program_config) as output:
+					futures = self._submit_spawns(
+						program_name, program_config, [process_info.slot for process_info in old_batch], output)
+					replacements = []
+					for old_process_info, future in zip(old_batch, futures):
+						try:
+							replacements.append((old_process_info, future.result()))
+						except Exception as e:
+							old_process_info.state = "FATAL"
+							self.metrics.inc("taskmaster_process_fatal_total", program=program_name)
+							self.logger.error(f"Failed to start process {old_process_info.name}: {e}")
+				self._replace_processes(program_name, replacements, require_active=False)
+				if len(replacements) < len(old_batch):
+					self.logger.error(
+						f"Rolling restart of {program_name} aborted: {len(old_batch) - len(replacements)} processes failed to start")
+					print(f"Rolling restart of {program_name} aborted")
+					return False
+				new_batch = [new_process_info for _, new_process_info in replacements]
+				if not self._wait_healthy(new_batch, program_config["starttime"]):
+					self.logger.error(
+						f"Rolling restart of {program_name} aborted: a new process exited within {program_config['starttime']} seconds")
+					print(f"Rolling restart of {program_name} aborted")
+					return False
+				self.logger.info(
+					f"Rolling restart of {program_name}: {offset + len(old_batch)}/{count} processes replaced")
+			print(f"Restarted program: {program_name}")
+			return True
+	
+	@staticmethod
+	def _batch_size(batch, num_processes: int) -> int:
+		try:
+			if isinstance(batch, str) and batch.endswith("%"):
+				size = num_processes * int(batch[:-1]) // 100
+			else:
+				size = int(batch)
+		except ValueError:
+			raise ValueError(f"Invalid restart batch: {batch}")
+		return max(1, size)
+	
+	@staticmethod
+	def _wait_healthy(process_infos: List[ProcessInfo], starttime: int) -> bool:
+		return not any(process_info.wait(process_info.start_time + starttime) for process_info in process_infos)
+	
+	def status_records(self, program_names: Optional[Iterable[str]] = None,
+	                   states: Optional[Iterable[str]] = None) -> List[Tuple[str, List[StatusRecord]]]:
+		program_names = None if program_names is None else set(program_names)
+		states = None if states is None else {state.upper() for state in states}
+		records = []
+		for program_name, process_infos in self._snapshot():
+			if program_names is not None and program_name not in program_names:
+				continue
+			program_records = []
+			for process_info in process_infos:
+				if not process_info.watched:
+					process_info.update_status()
+				if states is None or process_info.record.state in states:
+					program_records.append(process_info.record)
+			if program_records or states is None:
+				records.append((program_name, program_records))
+		return records
+	
+	def get_status(self, program_names: Optional[Iterable[str]] = None, states: Optional[Iterable[str]] = None):
+		return {
+			program_name: [record.as_dict() for record in records]
+			for program_name, records in self.status_records(program_names, states)
+		}
+	
+	def _instance_metrics(self):
+		for program_name, process_infos in self._snapshot():
+			for process_info in process_infos:
+				labels = {"program": program_name, "instance": process_info.slot}
+				returncode = process_info.poll()
+				yield "taskmaster_instance_up", labels, int(returncode is None)
+				yield "taskmaster_instance_uptime_seconds", labels, round(process_info.uptime, 3)
+				yield "taskmaster_instance_restarts", labels, process_info.restarts
+				if returncode is not None:
+					yield "taskmaster_instance_last_exit_code", labels, returncode
+					continue
+				sample = self.resource_sampler.get(process_info.process.pid)
+				if sample is None:
+					continue
+				yield "taskmaster_instance_cpu_seconds_total", labels, sample.cpu_seconds
+				yield "taskmaster_instance_rss_bytes", labels, sample.rss_bytes
+				yield "taskmaster_instance_threads", labels, sample.threads
+				if sample.fds is not None:
+					yield "taskmaster_instance_open_fds", labels, sample.fds
+	
+	def _program_metrics(self):
+		if not self.cgroups.enabled:
+			return
+		for program_name, _ in self._snapshot():
+			cpu_seconds, memory_bytes = self.cgroups.usage(program_name)
+			if cpu_seconds is not None:
+				yield "taskmaster_program_cpu_seconds_total", {"program": program_name}, cpu_seconds
+			if memory_bytes is not None:
+				yield "taskmaster_program_memory_bytes", {"program": program_name}, memory_bytes
+	
+	def update_config(self, new_config: dict, progress: Optional[Callable[[int, int], None]] = None):
+		self.command_resolver.refresh()
+		old_programs = set(self.config["programs"].keys())
+		new_programs = set(new_config["programs"].keys())
+		rolling_programs: Dict[str, Tuple[Any, Optional[int]]] = {}
+		
+		with self._locked(list(old_programs | new_programs)):
+			removed_programs = [name for name in old_programs - new_programs if name in self.processes]
+			restarted_programs = []
+			updated_programs = []
+			targets: Dict[str, List[ProcessInfo]] = {}
+			for program_name in old_programs & new_programs:
+				if program_name not in self.processes:
+					continue
+				new_program_config = new_config["programs"][program_name]
+				changed_fields = self._changed_fields(self.config["programs"][program_name], new_program_config)
+				if not changed_fields:
+					continue
+				if changed_fields - self.SUPERVISOR_FIELDS - {"numprocs"}:
+					if new_program_config.get("restartbatch") is None:
+						restarted_programs.append(program_name)
+						continue
+					rolling_programs[program_name] = (
+						new_program_config["restartbatch"],
+						min(len(self.processes[program_name]), new_program_config["numprocs"])
+					)
+				updated_programs.append(program_name)
+				surplus_processes = self._claim(program_name, new_program_config["numprocs"])
+				if surplus_processes:
+					targets[program_name] = surplus_processes
+					self.output_buffers.discard(program_name, new_program_config["numprocs"])
+			
+			started_programs = restarted_programs + [
+				program_name for program_name in new_programs - old_programs
+				if new_config["programs"][program_name]["autostart"]
+			]
+			tracker = Progress(progress, len(removed_programs) + len(updated_programs) + len(started_programs))
+			for program_name in removed_programs + restarted_programs:
+				targets[program_name] = self._claim(program_name)
+			self._stop_processes(targets)
+			for program_name in removed_programs + restarted_programs:
+				with self._table_lock:
+					del self.processes[program_name]
+				self.cgroups.remove(program_name)
+				self.logger.info(f"Stopped program: {program_name}")
+			tracker.advance(len(removed_programs))
+			for program_name in updated_programs:
+				if program_name in targets:
+					self.cgroups.remove(program_name, new_config["programs"][program_name]["numprocs"])
+			for program_name in old_programs - new_programs:
+				self._spawn_specs.pop(program_name, None)
+				self.output_buffers.discard(program_name)
+			
+			self.config = new_config
+			self.output_buffers.limit = self._tail_memory(new_config)
+			self.cgroups.configure(new_config.get("taskmaster", {}).get("cgroup"))
+			self._configure_state_file(new_config)
+			self.start_sampling()
+			for program_name in updated_programs:
+				self._apply_in_place(program_name, new_config["programs"][program_name])
+				tracker.advance()
+			
+			self._start_programs(started_programs, tracker)
+			self._persist()
+		self._rolling_restarts(rolling_programs)
+	
+	@staticmethod
+	def _changed_fields(old_program_config: dict, new_program_config: dict) -> set:
+		return {
+			key for key in old_program_config.keys() | new_program_config.keys()
+			if old_program_config.get(key) != new_program_config.get(key)
+		}
+	
+	def _apply_in_place(self, program_name: str, program_config: dict):
+		num_processes = program_config["numprocs"]
+		with self._table_lock:
+			current = self.processes[program_name]
+			process_list = current[:num_processes]
+			if len(process_list) < len(current):
+				self.processes[program_name] = process_list
+		self.cgroups.set_limits(program_name, program_config)
+		if len(process_list) < len(current):
+			self.logger.info(f"Scaled down program {program_name} to {num_processes} processes")
+		if len(process_list) < num_processes:
+			added = []
+			try:
+				with self._open_output(program_config) as output:
+					futures = self._submit_spawns(
+						program_name, program_config, range(len(process_list), num_processes), output)
+					for future in futures:
+						try:
+							added.append(future.result())
+						except Exception as e:
+							self.logger.error(f"Failed to start process for program {program_name}: {e}")
+							print(f"Failed to start process for program {program_name}: {e}")
+			except OSError as e:
+				self.logger.error(f"Failed to scale up program {program_name}: {e}")
+				print(f"Failed to scale up program {program_name}: {e}")
+			with self._table_lock:
+				self.processes[program_name] = self.processes[program_name] + added
+			self.logger.info(f"Scaled up program {program_name} to {len(process_list) + len(added)} processes")
+		self._persist()
+		self.logger.info(f"Updated program {program_name} in place")
+	
+	def check_and_restart(self):
+		for program_name, process_infos in self._snapshot():
+			for process_info in process_infos:
 				process_info.update_status()
-				if process_info.status == "finished":
-					if (program_config["autorestart"] == "always" or
-							(program_config["autorestart"] == "unexpected" and
-							 process_info.process.returncode not in program_config["exitcodes"])):
-						self._restart_process(program_name, i)
-	
-	def _restart_process(self, program_name: str, index: int):
-		program_config = self.config["programs"][program_name]
-		process_info = self.processes[program_name][index]
-		if process_info.restarts < program_config["startretries"]:
-			new_process = self._start_process(program_name, program_config)
-			new_process_info = ProcessInfo(new_process, program_config["cmd"], program_config)
-			new_process_info.restarts = process_info.restarts + 1
-			self.processes[program_name][index] = new_process_info
-			self.logger.info(f"Restarted process for {program_name} (PID: {new_process.pid})")
-		else:
-			self.logger.warning(f"Failed to restart {program_name} after {program_config['startretries']} attempts")
\ No newline at end of file
+				if (process_info.status == "finished" and not process_info.stopping
+						and process_info.state in ("STARTING", "RUNNING")):
+					self._handle_exit(program_name, process_info)
+		self.event_loop.run_timers()
+	
+	@staticmethod
+	def _should_restart(program_config: dict, process_info: ProcessInfo) -> bool:
+		return (program_config["autorestart"] == "always" or
+		        (program_config["autorestart"] == "unexpected" and
+		         process_info.process.returncode not in program_config["exitcodes"]))
+	
+	def _restart_process(self, program_name: str, process_info: ProcessInfo):
+		program_config = self.config["programs"].get(program_name)
+		if program_config is None or process_info.stopping or not self._is_current(program_name, process_info):
+			return
+		try:
+			new_process_info = self._create_process_info(program_name, program_config, process_info.slot)
+		except Exception as e:
+			self.logger.error(f"Failed to restart process {process_info.name}: {e}")
+			self._handle_exit(program_name, process_info)
+			return
+		new_process_info.restarts = process_info.restarts + 1
+		new_process_info.retries = process_info.retries
+		if not self._replace_processes(program_name, [(process_info, new_process_info)]):
+			new_process_info.stopping = True
+			new_process_info.process.kill()
+			self.logger.info(f"Discarded restart of {program_name}: the program is being stopped")
+			return
+		self.metrics.inc("taskmaster_process_restarts_total", program=program_name)
+		self.logger.info(f"Restarted process for {program_name} (PID: {new_process_info.process.pid})")
@@ -0,0 +1,60 @@
+import fnmatch
+import re
+from functools import lru_cache
+from typing import Dict, List, Pattern
+
+GLOB_CHARACTERS = re.compile(r"[*?\[]")
+REGEX_PREFIX = "re:"
+
+
+@lru_cache(maxsize=256)
+def compile_selector(selector: str) -> Pattern:
+    try:
+        if selector.startswith(REGEX_PREFIX):
+            return re.compile(selector[len(REGEX_PREFIX):])
+        return re.compile(fnmatch.translate(selector))
+    except re.error as e:
+        raise ValueError(f"Invalid selector {selector}: {e}")
+
+
+class ProgramSelector:
+    _cache = None
+
+    def __init__(self, config: dict):
+        self.names: List[str] = list(config["programs"])
+        self.groups: Dict[str, List[str]] = config.get("groups") or {}
+        self._index = set(self.names)
+
+    @classmethod
+    def for_config(cls, config: dict) -> "ProgramSelector":
+        cache = cls._cache
+        if cache is None or cache[0] is not config:
+            cache = cls._cache = (config, cls(config))
+        return cache[1]
+
+    @staticmethod
+    def is_pattern(selector: str) -> bool:
+        return selector.startswith(REGEX_PREFIX) or GLOB_CHARACTERS.search(selector) is not None
+
+    def resolve(self, selector: str) -> List[str]:
+        resolved = {}
+        for part in selector.split(","):
+            part = part.strip()
+            for name in self._resolve_part(part):
+                resolved[name] = None
+        return list(resolved)
+
+    def _resolve_part(self, selector: str) -> List[str]:
+        if selector == "all":
+            return self.names
+        if selector in self._index:
+            return [selector]
+        if selector in self.groups:
+            return self.groups[selector]
+        if not self.is_pattern(selector):
+            raise ValueError(f"Program {selector} not found")
+        pattern = compile_selector(selector)
+        matches = [name for name in self.names if pattern.fullmatch(name)]
+        if not matches:
+            raise ValueError(f"No programs match {selector}")
+        return matches
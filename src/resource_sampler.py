@@ -0,0 +1,80 @@
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class ResourceSample:
+    def __init__(self, cpu_seconds: float, cpu_percent: float, rss_bytes: int, threads: int, fds: Optional[int]):
+        self.cpu_seconds = cpu_seconds
+        self.cpu_percent = cpu_percent
+        self.rss_bytes = rss_bytes
+        self.threads = threads
+        self.fds = fds
+
+
+class ResourceSampler:
+    STAT_READ_SIZE = 1024
+
+    def __init__(self):
+        self._handles: Dict[int, int] = {}
+        self._previous: Dict[int, Tuple[float, float]] = {}
+        self._samples: Dict[int, ResourceSample] = {}
+
+    def get(self, pid: int) -> Optional[ResourceSample]:
+        return self._samples.get(pid)
+
+    def sample(self, pids: Iterable[int]) -> Dict[int, ResourceSample]:
+        pids = set(pids)
+        for pid in [pid for pid in self._handles if pid not in pids]:
+            self._forget(pid)
+        now = time.monotonic()
+        samples = {}
+        for pid in pids:
+            sample = self._sample(pid, now)
+            if sample is not None:
+                samples[pid] = sample
+        self._samples = samples
+        return samples
+
+    def close(self):
+        for pid in list(self._handles):
+            self._forget(pid)
+        self._samples = {}
+
+    def _forget(self, pid: int):
+        fd = self._handles.pop(pid, None)
+        if fd is not None:
+            os.close(fd)
+        self._previous.pop(pid, None)
+
+    def _sample(self, pid: int, now: float) -> Optional[ResourceSample]:
+        try:
+            fd = self._handles.get(pid)
+            if fd is None:
+                fd = self._handles[pid] = os.open(f"/proc/{pid}/stat", os.O_RDONLY | os.O_CLOEXEC)
+            stat = os.pread(fd, self.STAT_READ_SIZE, 0)
+        except OSError:
+            self._forget(pid)
+            return None
+        fields = stat[stat.rindex(b")") + 2:].split()
+        if not fields or fields[0] == b"Z":
+            return None
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        previous = self._previous.get(pid)
+        cpu_percent = 0.0
+        if previous is not None and now > previous[0]:
+            cpu_percent = 100 * (cpu_seconds - previous[1]) / (now - previous[0])
+        self._previous[pid] = (now, cpu_seconds)
+        return ResourceSample(cpu_seconds, cpu_percent, int(fields[21]) * PAGE_SIZE, int(fields[17]), self._count_fds(pid))
+
+    @staticmethod
+    def _count_fds(pid: int) -> Optional[int]:
+        path = f"/proc/{pid}/fd"
+        try:
+            count = os.stat(path).st_size
+            return count if count else len(os.listdir(path))
+        except OSError:
+            return None
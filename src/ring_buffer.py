@@ -0,0 +1,60 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class RingBuffer:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.end = 0
+        self._data: Optional[bytearray] = None
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes):
+        with self._lock:
+            if self.capacity:
+                if self._data is None:
+                    self._data = bytearray(self.capacity)
+                kept = data[-self.capacity:]
+                start = (self.end + len(data) - len(kept)) % self.capacity
+                first = min(len(kept), self.capacity - start)
+                self._data[start:start + first] = kept[:first]
+                self._data[:len(kept) - first] = kept[first:]
+            self.end += len(data)
+
+    def read(self, offset: int = 0) -> Tuple[int, bytes]:
+        with self._lock:
+            begin = max(offset, self.end - self.capacity, 0)
+            if begin >= self.end or self._data is None:
+                return self.end, b""
+            length = self.end - begin
+            start = begin % self.capacity
+            first = min(length, self.capacity - start)
+            return self.end, bytes(self._data[start:start + first]) + bytes(self._data[:length - first])
+
+
+class OutputBuffers:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.allocated = 0
+        self._buffers: Dict[Tuple[str, int], RingBuffer] = {}
+        self._lock = threading.Lock()
+
+    def get(self, program_name: str, slot: int, capacity: int) -> RingBuffer:
+        with self._lock:
+            buffer = self._buffers.get((program_name, slot))
+            if buffer is None:
+                buffer = RingBuffer(max(0, min(capacity, self.limit - self.allocated)))
+                self.allocated += buffer.capacity
+                self._buffers[(program_name, slot)] = buffer
+            return buffer
+
+    def discard(self, program_name: str, first_slot: int = 0):
+        with self._lock:
+            for key in [key for key in self._buffers if key[0] == program_name and key[1] >= first_slot]:
+                self.allocated -= self._buffers.pop(key).capacity
+
+    def read(self, program_name: str, offsets: Optional[Dict[int, int]] = None) -> Dict[int, Tuple[int, bytes]]:
+        offsets = offsets or {}
+        with self._lock:
+            buffers = {slot: buffer for (name, slot), buffer in self._buffers.items() if name == program_name}
+        return {slot: buffers[slot].read(offsets.get(slot, 0)) for slot in sorted(buffers)}
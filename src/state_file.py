@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Callable, Optional
+
+STATE_VERSION = 1
+
+
+def proc_start_time(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as stat:
+            fields = stat.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    if not fields or fields[0] == b"Z":
+        return None
+    return int(fields[19])
+
+
+class AdoptedProcess:
+    __slots__ = ("pid", "start", "returncode")
+
+    def __init__(self, pid: int, start: int):
+        self.pid = pid
+        self.start = start
+        self.returncode = None
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None and proc_start_time(self.pid) != self.start:
+            self.returncode = -1
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Process {self.pid} is still running")
+            time.sleep(0.05)
+        return self.returncode
+
+    def send_signal(self, sig: int):
+        if self.poll() is not None:
+            return
+        try:
+            os.kill(self.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class StateFile:
+    def __init__(self, path: str, logger: logging.Logger, snapshot: Callable[[], dict]):
+        self.path = path
+        self.logger = logger
+        self._snapshot = snapshot
+        self._dirty = threading.Event()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread = None
+
+    def load(self) -> dict:
+        try:
+            with open(self.path) as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable state file {self.path}: {e}")
+            return {}
+        if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+            self.logger.warning(f"Ignoring state file {self.path} with an unknown format")
+            return {}
+        return state
+
+    def mark_dirty(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="taskmaster-state", daemon=True)
+                self._thread.start()
+        self._dirty.set()
+
+    def _run(self):
+        while True:
+            self._dirty.wait()
+            self._dirty.clear()
+            self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            try:
+                self.write(self._snapshot())
+            except Exception as e:
+                self.logger.error(f"Failed to write state file {self.path}: {e}")
+
+    def write(self, state: dict):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(dict(state, version=STATE_VERSION), file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
@@ -1,38 +1,52 @@
+import argparse
 import signal
 import sys
 import time
 
 import logger
 from config_parser import ConfigParser
+from event_loop import EventLoop
 from process_manager import ProcessManager
+from program_selector import ProgramSelector
 from control_shell import ControlShell
-from logger import setup_logger
+from control_server import ControlServer
+from daemon import PidFile, PidFileError, daemonize, notify_systemd
+from logger import DEFAULT_LOG_SETTINGS, setup_logger
+from metrics import Metrics, MetricsServer
 import threading
 
 
 class Taskmaster:
     def __init__(self, config_file: str):
         self.config_file = config_file
-        self.logger = setup_logger()
         self.config_parser = ConfigParser(config_file)
         error, self.config = self.config_parser.parse()
         if error is not None:
             print(f"Failed to load configuration: {error}")
             sys.exit(1)
-        self.process_manager = ProcessManager(self.config, self.logger)
+        self.logger = setup_logger(self.config["taskmaster"])
+        self.metrics = Metrics()
+        self.event_loop = EventLoop(self.logger, self.metrics)
+        self.process_manager = ProcessManager(self.config, self.logger, self.event_loop, self.metrics)
         self.control_shell = ControlShell(self)
+        self.control_server = ControlServer(self, self.config["taskmaster"]["socket"], self.logger)
+        self.metrics_server = MetricsServer(
+            self.metrics, self.config["taskmaster"]["metricsaddress"], self.config["taskmaster"]["metricsport"], self.logger)
         self.is_running = threading.Event()
         self.is_running.set()
 
     def stop_all_programs(self):
-        for program_name in self.config["programs"]:
-            self.stop_program(program_name)
+        self.process_manager.stop_all_programs()
 
     def run_without_shell(self):
+        signal.signal(signal.SIGHUP, self.sighup_handler)
+        signal.signal(signal.SIGINT, self.sigint_handler)
+        signal.signal(signal.SIGTERM, self.sigterm_handler)
+        self._start_services()
         self.process_manager.start_initial_processes()
+        notify_systemd("READY=1")
         while self.is_running.is_set():
-            self.process_manager.check_and_restart()
-            time.sleep(1)
+            signal.pause()
 
     def compare_configs(self, old_config: dict, new_config: dict):
         old_programs = set(old_config["programs"].keys())
@@ -64,7 +78,7 @@ class Taskmaster:
                     if key not in old_program_config:
                         print(f"  {key} added with value {new_program_config[key]}")
     
-    def reload_config(self):
+    def reload_config(self, progress=None):
         old_config = self.config
         try:
             error, new_config = self.config_parser.parse()
@@ -72,17 +86,29 @@ class Taskmaster:
                 raise ValueError(error)
             
             self.compare_configs(old_config, new_config)
-            self.process_manager.update_config(new_config)
-            self.config = new_config
-            self.logger.info("Configuration reloaded successfully")
-            print("Configuration reloaded successfully")
+            self._update_logger(old_config["taskmaster"], new_config["taskmaster"])
         except Exception as e:
             error_message = f"Failed to reload configuration: {e}"
             self.logger.error(error_message)
             print(error_message)
             print("Continuing with the previous configuration")
-            self.config = old_config
-            self.process_manager.config = old_config
+            return
+        try:
+            self.process_manager.update_config(new_config, progress)
+        except Exception as e:
+            self.config = self.process_manager.config
+            error_message = f"Configuration reloaded with errors: {e}"
+            self.logger.error(error_message)
+            print(error_message)
+            return
+        self.config = new_config
+        self.logger.info("Configuration reloaded successfully")
+        print("Configuration reloaded successfully")
+
+    def _update_logger(self, old_settings: dict, new_settings: dict):
+        if any(old_settings.get(key) != new_settings.get(key) for key in DEFAULT_LOG_SETTINGS):
+            setup_logger(new_settings)
+            self.logger.info("Logging settings reloaded")
 
     def sighup_handler(self, signum, frame):
         self.logger.info("Received SIGHUP, reloading configuration")
@@ -90,53 +116,118 @@ class Taskmaster:
     
     def sigint_handler(self, signum, frame):
         self.logger.info("Received SIGINT, shutting down...")
+        self.shutdown()
+
+    def sigterm_handler(self, signum, frame):
+        self.logger.info("Received SIGTERM, shutting down...")
+        self.shutdown()
+
+    def shutdown(self):
+        if not self.is_running.is_set():
+            return
+        notify_systemd("STOPPING=1")
         self.is_running.clear()
         self.stop_all_programs()
         while any(self.process_manager.processes.values()):
             time.sleep(0.1)
+        self.process_manager.flush_state()
+        self._stop_services()
         self.logger.info("All processes stopped, exiting...")
         sys.exit(0)
 
+    def _start_services(self):
+        self.event_loop.start()
+        self.process_manager.start_sampling()
+        self.control_server.start()
+        if self.config["taskmaster"]["metricsport"]:
+            self.metrics_server.start()
+
+    def _stop_services(self):
+        self.control_server.stop()
+        self.metrics_server.stop()
+
     def run(self):
         signal.signal(signal.SIGHUP, self.sighup_handler)
         signal.signal(signal.SIGINT, self.sigint_handler)
+        self._start_services()
         self.process_manager.start_initial_processes()
 
-        def check_processes():
-            while self.is_running.is_set():
-                self.process_manager.check_and_restart()
-                time.sleep(1)
-
-        checker_thread = threading.Thread(target=check_processes)
-        checker_thread.daemon = True
-        checker_thread.start()
-
         try:
             self.control_shell.cmdloop()
         except KeyboardInterrupt:
             self.sigint_handler(None, None)
+        finally:
+            self._stop_services()
 
     
-    def status(self):
-        return self.process_manager.get_status()
-
-    def start_program(self, program_name: str):
-        self.process_manager.start_program(program_name)
-
-    def stop_program(self, program_name: str):
-        self.process_manager.stop_program(program_name)
-
-    def restart_all_programs(self):
-        self.process_manager.restart_all_programs()
-
-    def restart_program(self, program_name: str):
-        self.process_manager.restart_program(program_name)
+    def status(self, selector: str = None, states=None):
+        return self.process_manager.get_status(self.resolve(selector) if selector else None, states)
+
+    def resolve(self, selector: str):
+        return ProgramSelector.for_config(self.config).resolve(selector)
+
+    def start_program(self, selector: str, progress=None):
+        self.process_manager.start_in_dependency_order(self.resolve(selector), progress)
+
+    def _resolve_running(self, selector: str):
+        if selector == "all":
+            return self.process_manager.running_programs()
+        return self.resolve(selector)
+
+    def stop_program(self, selector: str, progress=None):
+        self.process_manager.stop_in_dependency_order(self._resolve_running(selector), progress)
+
+    def restart_program(self, selector: str, batch=None, progress=None):
+        self.process_manager.restart_programs(self._resolve_running(selector), batch, progress)
+
+    def render_metrics(self) -> str:
+        return self.metrics.render()
+
+    def tail(self, program_name: str, offsets=None):
+        return {
+            slot: (offset, data.decode(errors="replace"))
+            for slot, (offset, data) in self.process_manager.tail(program_name, offsets).items()
+        }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="taskmaster", description="Supervise the programs described in a configuration file.")
+    parser.add_argument("config_file", help="path to the YAML configuration")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("-d", "--daemon", action="store_true", help="detach from the terminal and run in the background")
+    mode.add_argument("-f", "--foreground", action="store_true", help="run without the shell and stay attached (for systemd)")
+    parser.add_argument("-p", "--pidfile", help="write the supervisor PID to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    pid_file = PidFile(args.pidfile) if args.pidfile else None
+    if pid_file is not None and pid_file.running_pid() is not None:
+        print(f"Taskmaster is already running (PID: {pid_file.running_pid()}, pidfile: {pid_file.path})")
+        return 1
+
+    taskmaster = Taskmaster(args.config_file)
+    if args.daemon:
+        daemonize()
+    try:
+        if pid_file is not None:
+            pid_file.acquire()
+    except (OSError, PidFileError) as e:
+        taskmaster.logger.error(f"Failed to write pidfile: {e}")
+        print(f"Failed to write pidfile: {e}")
+        return 1
+
+    try:
+        if args.daemon or args.foreground:
+            taskmaster.run_without_shell()
+        else:
+            taskmaster.run()
+    finally:
+        if pid_file is not None:
+            pid_file.release()
+    return 0
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python taskmaster.py <config_file>")
-        sys.exit(1)
-
-    taskmaster = Taskmaster(sys.argv[1])
-    taskmaster.run()
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import argparse
+import json
+import socket
+import sys
+
+from config_parser import ConfigParser
+from control_shell import ControlShell
+
+
+class ControlError(Exception):
+    pass
+
+
+class RemoteTaskmaster:
+    def __init__(self, socket_path: str, timeout: float = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def request(self, command: str, **args):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps({"command": command, "args": args}).encode() + b"\n")
+            with sock.makefile("rb") as stream:
+                line = stream.readline()
+        if not line:
+            raise ControlError("Connection closed by taskmaster")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise ControlError(response["error"])
+        return response["result"]
+
+    @property
+    def config(self) -> dict:
+        return self.request("config")
+
+    def status(self, selector: str = None, states=None) -> dict:
+        return self.request("status", program=selector, states=states)
+
+    def start_program(self, program_name: str, progress=None):
+        self.request("start", program=program_name)
+
+    def stop_program(self, program_name: str, progress=None):
+        self.request("stop", program=program_name)
+
+    def stop_all_programs(self):
+        self.request("stop", program="all")
+
+    def restart_program(self, program_name: str, batch=None, progress=None):
+        self.request("restart", program=program_name, batch=batch)
+
+    def restart_all_programs(self, batch=None):
+        self.request("restart", program="all", batch=batch)
+
+    def reload_config(self, progress=None):
+        self.request("reload")
+
+    def render_metrics(self) -> str:
+        return self.request("metrics")
+
+    def tail(self, program_name: str, offsets=None):
+        result = self.request("tail", program=program_name, offsets=offsets or {})
+        return {int(slot): (offset, data) for slot, (offset, data) in result.items()}
+
+
+class RemoteControlShell(ControlShell):
+    intro = (
+        "Connected to Taskmaster.\n"
+        "Type 'help' or '?' to list commands."
+    )
+    prompt = "(taskmasterctl) "
+
+    def __init__(self, taskmaster: RemoteTaskmaster):
+        super().__init__(taskmaster)
+        self.failed = False
+
+    def onecmd(self, line: str) -> bool:
+        try:
+            return super().onecmd(line)
+        except (OSError, ControlError) as e:
+            self.failed = True
+            print(f"Error: {e}")
+            return False
+
+    def do_quit(self, arg: str):
+        self.jobs.wait_all()
+        self._report_finished_jobs()
+        self.jobs.shutdown()
+        return True
+
+    def signal_handler(self, signum, frame):
+        print()
+        self.jobs.shutdown(wait=False)
+        sys.exit(130)
+
+    def _report_finished_jobs(self):
+        for job in self.jobs.jobs.values():
+            if job.state == "failed" and not job.reported:
+                self.failed = True
+        super()._report_finished_jobs()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="taskmasterctl", description="Control a running Taskmaster.")
+    parser.add_argument("-s", "--socket", default=ConfigParser.DEFAULT_SETTINGS["socket"],
+                        help="path of the Taskmaster control socket")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="run a single command instead of the shell")
+    args = parser.parse_args(argv)
+
+    shell = RemoteControlShell(RemoteTaskmaster(args.socket))
+    if args.command:
+        shell.onecmd(" ".join(args.command))
+        shell.do_quit("")
+    else:
+        shell.cmdloop()
+    return 1 if shell.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
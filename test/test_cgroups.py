@@ -0,0 +1,92 @@
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+
+from cgroups import CgroupManager
+
+
+def writable_cgroup2_mount():
+    with open("/proc/self/mounts") as mounts:
+        for line in mounts:
+            fields = line.split()
+            if fields[2] == "cgroup2" and os.access(fields[1], os.W_OK):
+                return fields[1]
+    return None
+
+
+CGROUP2_MOUNT = writable_cgroup2_mount()
+
+
+class TestCgroupManagerUnavailable(unittest.TestCase):
+    def test_missing_hierarchy_disables_cgroups(self):
+        logger = Mock()
+        with tempfile.TemporaryDirectory() as root:
+            cgroups = CgroupManager(root, logger)
+
+            self.assertFalse(cgroups.enabled)
+            self.assertIsNone(cgroups.prepare("program", 0, {}))
+            logger.warning.assert_called_once()
+
+    def test_disabled_without_root(self):
+        cgroups = CgroupManager(None, Mock())
+        self.assertFalse(cgroups.enabled)
+        cgroups.remove("program")
+
+
+@unittest.skipUnless(CGROUP2_MOUNT, "needs a writable cgroup v2 hierarchy")
+class TestCgroupManager(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="taskmaster-test-", dir=CGROUP2_MOUNT)
+        self.addCleanup(os.rmdir, self.root)
+        self.cgroups = CgroupManager(self.root, Mock())
+        self.processes = []
+
+    def tearDown(self):
+        self.cgroups.remove("program")
+        for process in self.processes:
+            process.wait(timeout=5)
+
+    def spawn(self, cmd, slot=0):
+        path = self.cgroups.prepare("program", slot, {})
+        process = subprocess.Popen(self.cgroups.command(path, ["/bin/sh", "-c", cmd]))
+        self.processes.append(process)
+        self.assertTrue(self.cgroups.attach(path, process.pid))
+        return path, process
+
+    def test_kill_reaches_the_whole_tree(self):
+        path, process = self.spawn("sleep 30 & sleep 30 & wait")
+        self.assertEqual(path, os.path.join(self.root, "program", "0"))
+        deadline = time.monotonic() + 5
+        while len(self.cgroups.procs(path)) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.cgroups.procs(path)), 3)
+
+        self.cgroups.kill(path)
+
+        self.assertEqual(process.wait(timeout=5), -9)
+        self.assertTrue(self.cgroups.wait_empty(path, time.monotonic() + 5))
+
+    def test_usage_is_read_from_the_program_cgroup(self):
+        self.spawn("exec sleep 30")
+
+        cpu_seconds, _ = self.cgroups.usage("program")
+
+        self.assertIsNotNone(cpu_seconds)
+        self.assertGreaterEqual(cpu_seconds, 0)
+
+    def test_remove_drops_surplus_slots(self):
+        for slot in range(2):
+            self.spawn("exec sleep 30", slot)
+
+        self.cgroups.remove("program", 1)
+
+        self.assertTrue(os.path.isdir(os.path.join(self.root, "program", "0")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "program", "1")))
+        self.assertEqual(self.processes[1].wait(timeout=5), -9)
+
+
+if __name__ == '__main__':
+    unittest.main()
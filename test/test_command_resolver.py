@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from command_resolver import CommandResolver
+
+
+class TestCommandResolver(unittest.TestCase):
+	def setUp(self):
+		self.temp_dir = tempfile.mkdtemp(dir='/tmp')
+		self.resolver = CommandResolver()
+		patcher = patch.dict(os.environ, {"PATH": self.temp_dir})
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def tearDown(self):
+		shutil.rmtree(self.temp_dir)
+
+	def create_file(self, name, mode=0o755):
+		path = os.path.join(self.temp_dir, name)
+		with open(path, 'w') as f:
+			f.write("#!/bin/sh\n")
+		os.chmod(path, mode)
+		return path
+
+	def test_resolves_executable_in_path(self):
+		path = self.create_file("my_tool")
+		self.assertEqual(self.resolver.resolve("my_tool"), path)
+
+	def test_ignores_non_executable_file(self):
+		self.create_file("not_a_tool", mode=0o644)
+		self.assertIsNone(self.resolver.resolve("not_a_tool"))
+
+	def test_falls_back_to_system_directories(self):
+		self.assertIsNotNone(self.resolver.resolve("sh"))
+
+	def test_resolves_paths_with_separator(self):
+		path = self.create_file("script.sh")
+		self.assertEqual(self.resolver.resolve(path), path)
+		self.assertIsNone(self.resolver.resolve(os.path.join(self.temp_dir, "missing.sh")))
+
+	def test_refresh_picks_up_directory_changes(self):
+		self.assertIsNone(self.resolver.resolve("late_tool"))
+		path = self.create_file("late_tool")
+		os.utime(self.temp_dir, ns=(0, os.stat(self.temp_dir).st_mtime_ns + 1))
+		self.resolver.refresh()
+		self.assertEqual(self.resolver.resolve("late_tool"), path)
+
+	def test_unchanged_directories_are_not_rescanned(self):
+		self.resolver.refresh()
+		with patch('os.listdir') as mock_listdir:
+			self.resolver.refresh()
+			self.resolver.resolve("sh")
+		mock_listdir.assert_not_called()
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -2,7 +2,7 @@ import shutil
 import unittest
 import tempfile
 import os
-from config_parser import ConfigParser
+from config_parser import ConfigParser, ConfigValidationError
 from schema import SchemaError
 
 
@@ -115,6 +115,124 @@ class TestConfigParser(unittest.TestCase):
 		self.assertEqual(config['programs']['test_program']['env']['TEST_VAR'], 'test_value')
 		self.assertEqual(config['programs']['test_program']['env']['ANOTHER_VAR'], 'another_value')
 
+	
+	def test_restart_batch_validation(self):
+		config_content = """
+        programs:
+          rolling_program:
+            cmd: "echo hello"
+            restartbatch: "25%"
+          invalid_program:
+            cmd: "echo hello"
+            restartbatch: "0%"
+        """
+		config_file = self.create_config_file(config_content)
+		error, config = ConfigParser(config_file).parse()
+		
+		self.assertIsNone(config)
+		self.assertIn("Invalid restart batch: 0%", error)
+	
+	def test_parse_size(self):
+		self.assertEqual(ConfigParser.parse_size(4096), 4096)
+		self.assertEqual(ConfigParser.parse_size("512M"), 512 * 1024 ** 2)
+		self.assertEqual(ConfigParser.parse_size("2GB"), 2 * 1024 ** 3)
+		with self.assertRaises(ConfigValidationError):
+			ConfigParser.parse_size("lots")
+	
+	def test_parse_cpu_max(self):
+		self.assertEqual(ConfigParser.parse_cpu_max("150%"), "150000 100000")
+		self.assertEqual(ConfigParser.parse_cpu_max("20000 50000"), "20000 50000")
+		self.assertEqual(ConfigParser.parse_cpu_max("max"), "max")
+		with self.assertRaises(ConfigValidationError):
+			ConfigParser.parse_cpu_max("two cores")
+
+	
+	def test_dependency_cycle_is_rejected(self):
+		config_content = """
+        programs:
+          web:
+            cmd: "echo web"
+            depends_on: [api]
+          api:
+            cmd: "echo api"
+            depends_on: [web]
+        """
+		config_file = self.create_config_file(config_content)
+		error, config = ConfigParser(config_file).parse()
+		
+		self.assertIsNone(config)
+		self.assertIn("Dependency cycle:", error)
+	
+	def test_unknown_dependency_is_rejected(self):
+		config_content = """
+        programs:
+          web:
+            cmd: "echo web"
+            depends_on: [db]
+        """
+		config_file = self.create_config_file(config_content)
+		error, config = ConfigParser(config_file).parse()
+		
+		self.assertIsNone(config)
+		self.assertIn("Program web depends on unknown program: db", error)
+	
+	def test_groups_are_parsed(self):
+		config_content = """
+        groups:
+          service: [web, api]
+        programs:
+          web:
+            cmd: "echo web"
+          api:
+            cmd: "echo api"
+        """
+		config_file = self.create_config_file(config_content)
+		error, config = ConfigParser(config_file).parse()
+		
+		self.assertIsNone(error)
+		self.assertEqual(config["groups"], {"service": ["web", "api"]})
+	
+	def test_group_with_unknown_program_is_rejected(self):
+		config_content = """
+        groups:
+          service: [web, db]
+        programs:
+          web:
+            cmd: "echo web"
+        """
+		config_file = self.create_config_file(config_content)
+		error, config = ConfigParser(config_file).parse()
+		
+		self.assertIsNone(config)
+		self.assertIn("Group service contains unknown program: db", error)
+
+	
+	def test_unchanged_file_reuses_the_parsed_config(self):
+		config_file = self.create_config_file("programs:\n  web:\n    cmd: echo web\n")
+		parser = ConfigParser(config_file)
+		_, config = parser.parse()
+		
+		error, reparsed = parser.parse()
+		
+		self.assertIsNone(error)
+		self.assertIs(reparsed, config)
+	
+	def test_only_changed_programs_are_revalidated(self):
+		config_file = self.create_config_file("programs:\n  web:\n    cmd: echo web\n  api:\n    cmd: echo api\n")
+		parser = ConfigParser(config_file)
+		_, config = parser.parse()
+		self.create_config_file("programs:\n  web:\n    cmd: echo web\n  api:\n    cmd: echo api\n    numprocs: 2\n")
+		
+		error, reloaded = parser.parse()
+		
+		self.assertIsNone(error)
+		self.assertIs(reloaded["programs"]["web"], config["programs"]["web"])
+		self.assertEqual(reloaded["programs"]["api"]["numprocs"], 2)
+		self.create_config_file("programs:\n  web:\n    cmd: echo web\n  api:\n    cmd: echo api\n    numprocs: 0\n")
+		error, config = parser.parse()
+		self.assertIsNone(config)
+		self.assertIn("Key 'api' error", error)
+
 
 if __name__ == '__main__':
 	unittest.main()
\ No newline at end of file
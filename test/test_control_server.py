@@ -0,0 +1,144 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from io import StringIO
+from unittest.mock import MagicMock, call, patch
+
+from control_server import ControlServer
+from taskmasterctl import ControlError, RemoteControlShell, RemoteTaskmaster
+
+
+class TestControlServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir='/tmp')
+        self.socket_path = os.path.join(self.temp_dir, "taskmaster.sock")
+        self.taskmaster_mock = MagicMock()
+        self.taskmaster_mock.config = {"programs": {"program1": {"cmd": "sleep 1"}, "program2": {"cmd": "sleep 2"}}}
+        self.taskmaster_mock.status.return_value = {
+            "program1": [{"pid": 123, "cmd": "sleep 1", "status": "running", "state": "RUNNING",
+                          "restarts": 0, "uptime": 60}]
+        }
+        self.server = ControlServer(self.taskmaster_mock, self.socket_path, MagicMock())
+        self.server.start()
+        self.client = RemoteTaskmaster(self.socket_path, timeout=5)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_status_and_config(self):
+        self.assertEqual(self.client.status()["program1"][0]["pid"], 123)
+        self.assertEqual(self.client.request("status", program="program2"), {})
+        self.assertEqual(self.client.config, self.taskmaster_mock.config)
+
+    def test_commands_are_forwarded(self):
+        self.client.start_program("program1")
+        self.client.stop_program("program2")
+        self.client.restart_program("program1", "50%")
+        self.client.stop_all_programs()
+        self.client.reload_config()
+
+        self.taskmaster_mock.start_program.assert_called_once_with("program1")
+        self.taskmaster_mock.stop_program.assert_has_calls([call("program2"), call("all")])
+        self.taskmaster_mock.restart_program.assert_called_once_with("program1", "50%")
+        self.taskmaster_mock.stop_all_programs.assert_not_called()
+        self.taskmaster_mock.reload_config.assert_called_once()
+
+    def test_selectors_are_resolved(self):
+        self.taskmaster_mock.config["groups"] = {"sleepers": ["program1", "program2"]}
+
+        self.assertEqual(list(self.client.request("status", program="program*")), ["program1"])
+        self.client.restart_program("sleepers")
+
+        self.taskmaster_mock.restart_program.assert_called_once_with("sleepers", None)
+        with self.assertRaisesRegex(ControlError, "No programs match web-"):
+            self.client.stop_program("web-*")
+        self.taskmaster_mock.stop_program.assert_not_called()
+
+    def test_errors_are_reported(self):
+        with self.assertRaisesRegex(ControlError, "Program missing not found"):
+            self.client.start_program("missing")
+        with self.assertRaisesRegex(ControlError, "Invalid request"):
+            self.client.request("shutdown")
+
+    def test_malformed_request_keeps_connection_open(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            stream = sock.makefile("rwb")
+            stream.write(b"not json\n{\"command\": \"status\"}\n")
+            stream.flush()
+            self.assertIn(b'"ok": false', stream.readline())
+            self.assertIn(b'"ok": true', stream.readline())
+
+    def test_status_is_served_while_a_command_blocks(self):
+        release = threading.Event()
+        self.taskmaster_mock.restart_program.side_effect = lambda *args: release.wait(5)
+        restart = threading.Thread(target=self.client.restart_program, args=("program1",))
+        restart.start()
+        try:
+            start = time.monotonic()
+            for _ in range(50):
+                self.client.status()
+            self.assertLess(time.monotonic() - start, 2)
+            self.assertTrue(restart.is_alive())
+        finally:
+            release.set()
+            restart.join()
+
+    def test_tail(self):
+        self.taskmaster_mock.tail.return_value = {0: (12, "crash output")}
+
+        self.assertEqual(self.client.tail("program1", {0: 4}), {0: (12, "crash output")})
+        self.taskmaster_mock.tail.assert_called_once_with("program1", {0: 4})
+        with self.assertRaisesRegex(ControlError, "not found"):
+            self.client.tail("missing")
+
+    def test_stop_removes_socket(self):
+        self.server.stop()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_live_socket_is_not_taken_over(self):
+        other_server = ControlServer(self.taskmaster_mock, self.socket_path, MagicMock())
+        other_server.start()
+        self.assertFalse(other_server.is_running)
+        other_server.stop()
+
+        self.assertTrue(os.path.exists(self.socket_path))
+        self.assertEqual(self.client.status()["program1"][0]["pid"], 123)
+
+    def test_stop_leaves_a_replaced_socket(self):
+        os.unlink(self.socket_path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(self.socket_path)
+            self.server.stop()
+            self.assertTrue(os.path.exists(self.socket_path))
+
+    def test_remote_shell_drives_the_server(self):
+        shell = RemoteControlShell(self.client)
+        with patch('sys.stdout', new=StringIO()) as fake_out:
+            shell.onecmd("status")
+            shell.onecmd("stop program1")
+            shell.do_quit("")
+            output = fake_out.getvalue()
+
+        self.assertIn("123", output)
+        self.assertIn("stop program1 done", output)
+        self.taskmaster_mock.stop_program.assert_called_once_with("program1")
+        self.taskmaster_mock.stop_all_programs.assert_not_called()
+        self.assertFalse(shell.failed)
+
+    def test_remote_shell_reports_unreachable_server(self):
+        shell = RemoteControlShell(RemoteTaskmaster(os.path.join(self.temp_dir, "missing.sock")))
+        with patch('sys.stdout', new=StringIO()) as fake_out:
+            shell.onecmd("status")
+
+        self.assertIn("Error:", fake_out.getvalue())
+        self.assertTrue(shell.failed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
 from io import StringIO
 import sys
+import threading
+import time
 
 from control_shell import ControlShell
 
@@ -41,39 +43,95 @@ class TestControlShell(unittest.TestCase):
 		self.assertIn("123", output)
 		self.assertNotIn("program2", output)
 	
-	def test_do_start_all(self):
+	def test_do_status_selector(self):
 		self.taskmaster_mock.status.return_value = {
-			"program1": [],
-			"program2": []
+			"web-1": [{"pid": 123, "cmd": "test", "status": "running", "restarts": 0, "uptime": 60}],
+			"api": [{"pid": 456, "cmd": "test2", "status": "running", "restarts": 0, "uptime": 30}]
 		}
+		self.taskmaster_mock.config = {"programs": {"web-1": {}, "web-2": {}, "api": {}}, "groups": {}}
 		
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_status("web-*")
+			self.shell.do_status("db")
+			output = fake_out.getvalue()
+		
+		self.assertIn("123", output)
+		self.assertIn("web-2", output)
+		self.assertNotIn("456", output)
+		self.assertIn("Program db not found", output)
+	
+	def test_do_status_compact_pages(self):
+		self.taskmaster_mock.status.return_value = {
+			"web": [{"instance": slot, "pid": 100 + slot, "cmd": "test", "status": "running", "state": "RUNNING",
+			         "restarts": 0, "uptime": 1.5} for slot in range(5)]
+		}
+		self.taskmaster_mock.config = {"programs": {"web": {}}, "groups": {}}
+		
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_status("web -c instance,pid -p 2 -n 2 -s running")
+			output = fake_out.getvalue()
+		
+		self.assertEqual(output.splitlines(), ["Instance  PID", "2         102", "3         103", "Page 2/3 (5 instances)"])
+		self.taskmaster_mock.status.assert_called_once_with("web", ["RUNNING"])
+	
+	def test_do_status_rejects_unknown_column(self):
+		self.taskmaster_mock.config = {"programs": {"web": {}}, "groups": {}}
+		
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_status("-c program,memory")
+		
+		self.assertIn("Unknown column: memory", fake_out.getvalue())
+		self.taskmaster_mock.status.assert_not_called()
+	
+	def test_do_start_all(self):
 		with patch('sys.stdout', new=StringIO()) as fake_out:
 			self.shell.do_start("all")
+			self.shell.jobs.wait_all()
 		
-		self.taskmaster_mock.start_program.assert_any_call("program1")
-		self.taskmaster_mock.start_program.assert_any_call("program2")
+		self.taskmaster_mock.start_program.assert_called_once_with("all", ANY)
+	
+	def test_stop_and_restart_all_use_the_selector(self):
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_stop("all")
+			self.shell.do_restart("all 25%")
+			self.shell.jobs.wait_all()
+		
+		self.taskmaster_mock.stop_program.assert_called_once_with("all", ANY)
+		self.taskmaster_mock.restart_program.assert_called_once_with("all", "25%", ANY)
+		self.taskmaster_mock.stop_all_programs.assert_not_called()
 	
 	def test_do_start_specific_program(self):
 		with patch('sys.stdout', new=StringIO()) as fake_out:
 			self.shell.do_start("program1")
+			self.shell.jobs.wait_all()
 		
-		self.taskmaster_mock.start_program.assert_called_once_with("program1")
+		self.taskmaster_mock.start_program.assert_called_once_with("program1", ANY)
 	
 	def test_do_stop(self):
 		with patch('sys.stdout', new=StringIO()) as fake_out:
 			self.shell.do_stop("program1")
+			self.shell.jobs.wait_all()
 		
-		self.taskmaster_mock.stop_program.assert_called_once_with("program1")
+		self.taskmaster_mock.stop_program.assert_called_once_with("program1", ANY)
 	
 	def test_do_restart(self):
 		with patch('sys.stdout', new=StringIO()) as fake_out:
 			self.shell.do_restart("program1")
+			self.shell.jobs.wait_all()
+		
+		self.taskmaster_mock.restart_program.assert_called_once_with("program1", None, ANY)
+	
+	def test_do_restart_with_batch(self):
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_restart("program1 25%")
+			self.shell.jobs.wait_all()
 		
-		self.taskmaster_mock.restart_program.assert_called_once_with("program1")
+		self.taskmaster_mock.restart_program.assert_called_once_with("program1", "25%", ANY)
 	
 	def test_do_reload(self):
 		with patch('sys.stdout', new=StringIO()) as fake_out:
 			self.shell.do_reload("")
+			self.shell.jobs.wait_all()
 		
 		self.taskmaster_mock.reload_config.assert_called_once()
 	
@@ -82,6 +140,18 @@ class TestControlShell(unittest.TestCase):
 		self.assertTrue(result)
 		self.taskmaster_mock.stop_all_programs.assert_called_once()
 	
+	def test_do_quit_waits_for_running_jobs(self):
+		calls = []
+		self.taskmaster_mock.restart_program.side_effect = lambda *args: (time.sleep(0.2), calls.append("restart"))
+		self.taskmaster_mock.stop_all_programs.side_effect = lambda: calls.append("stop all")
+		
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_restart("program1")
+			self.shell.do_quit("")
+		
+		self.assertEqual(calls, ["restart", "stop all"])
+		self.assertIn("Waiting for running jobs", fake_out.getvalue())
+	
 	def test_do_cat(self):
 		self.taskmaster_mock.config = {
 			"programs": {
@@ -97,6 +167,79 @@ class TestControlShell(unittest.TestCase):
 		self.assertIn("cmd: test", output)
 		self.assertIn("numprocs: 1", output)
 	
+	def test_stop_runs_in_background(self):
+		release = threading.Event()
+		self.taskmaster_mock.stop_program.side_effect = lambda name, progress: release.wait(5)
+		
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_stop("program1")
+			job = self.shell.jobs.get(1)
+			self.assertEqual(job.completed, 0)
+			release.set()
+			self.shell.do_wait("1")
+			output = fake_out.getvalue()
+		
+		self.assertEqual(job.state, "done")
+		self.assertEqual(job.progress, "1/1")
+		self.assertIn("[1] stop program1 started", output)
+		self.assertIn("[1] stop program1 done", output)
+	
+	def test_job_progress_is_reported_per_program(self):
+		release = threading.Event()
+		
+		def stop_program(selector, progress):
+			progress(2, 3)
+			release.wait(5)
+		
+		self.taskmaster_mock.stop_program.side_effect = stop_program
+		
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_stop("all")
+			job = self.shell.jobs.get(1)
+			deadline = time.monotonic() + 5
+			while job.completed < 2 and time.monotonic() < deadline:
+				time.sleep(0.01)
+			self.assertEqual(job.progress, "2/3")
+			release.set()
+			self.shell.do_wait("1")
+		
+		self.assertEqual(job.progress, "3/3")
+	
+	def test_failed_job_is_reported(self):
+		self.taskmaster_mock.restart_program.side_effect = RuntimeError("boom")
+		
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_restart("program1")
+			self.shell.do_wait("")
+			output = fake_out.getvalue()
+		
+		self.assertIn("[1] restart program1 failed: boom", output)
+	
+	def test_do_tail(self):
+		self.taskmaster_mock.config = {"programs": {"program1": {}}}
+		self.taskmaster_mock.tail.return_value = {0: (10, "last line\n"), 1: (0, "")}
+		
+		with patch('sys.stdout', new=StringIO()) as fake_out:
+			self.shell.do_tail("program1")
+			self.shell.do_tail("missing")
+			output = fake_out.getvalue()
+		
+		self.assertIn("==> program1:0 <==\nlast line\n", output)
+		self.assertNotIn("program1:1", output)
+		self.assertIn("Program missing not found", output)
+	
+	def test_do_tail_follow(self):
+		self.taskmaster_mock.config = {"programs": {"program1": {}}}
+		self.taskmaster_mock.tail.side_effect = [{0: (6, "first\n")}, {0: (13, "second\n")}]
+		
+		with patch('sys.stdout', new=StringIO()) as fake_out, \
+				patch('time.sleep', side_effect=[None, KeyboardInterrupt]):
+			self.shell.do_tail("program1 -f")
+			output = fake_out.getvalue()
+		
+		self.assertIn("first\nsecond\n", output)
+		self.taskmaster_mock.tail.assert_called_with("program1", {0: 6})
+	
 	def test_command_history(self):
 		self.shell.precmd("status")
 		self.shell.precmd("start program1")
@@ -0,0 +1,86 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import yaml
+
+import daemon
+from daemon import PidFile, PidFileError
+
+
+class TestPidFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir='/tmp')
+        self.path = os.path.join(self.temp_dir, "taskmaster.pid")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_acquire_writes_pid_and_release_removes_file(self):
+        pid_file = PidFile(self.path)
+        with pid_file:
+            with open(self.path) as f:
+                self.assertEqual(int(f.read()), os.getpid())
+            self.assertEqual(pid_file.running_pid(), os.getpid())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_second_instance_is_refused(self):
+        with PidFile(self.path):
+            with self.assertRaises(PidFileError):
+                PidFile(self.path).acquire()
+
+    def test_stale_pidfile_is_replaced(self):
+        process = subprocess.Popen(["true"])
+        process.wait()
+        with open(self.path, "w") as f:
+            f.write(f"{process.pid}\n")
+
+        pid_file = PidFile(self.path)
+        self.assertIsNone(pid_file.running_pid())
+        with pid_file:
+            self.assertEqual(pid_file.running_pid(), os.getpid())
+
+
+class TestDaemonMode(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir='/tmp')
+        self.pid_path = os.path.join(self.temp_dir, "taskmaster.pid")
+        self.config_path = os.path.join(self.temp_dir, "config.yaml")
+        with open(self.config_path, "w") as f:
+            yaml.safe_dump({
+                "taskmaster": {"socket": os.path.join(self.temp_dir, "taskmaster.sock")},
+                "programs": {"sleeper": {"cmd": "sleep 30", "stdout": "/dev/null", "stderr": "/dev/null"}},
+            }, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def wait_for(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return condition()
+
+    def test_daemon_detaches_and_stops_on_sigterm(self):
+        taskmaster_path = os.path.join(os.path.dirname(daemon.__file__), "taskmaster.py")
+        launcher = subprocess.run(
+            [sys.executable, taskmaster_path, self.config_path, "--daemon", "--pidfile", self.pid_path],
+            cwd=self.temp_dir, timeout=10
+        )
+        self.assertEqual(launcher.returncode, 0)
+        self.assertTrue(self.wait_for(lambda: PidFile(self.pid_path).running_pid() is not None))
+        pid = PidFile(self.pid_path).running_pid()
+        self.assertNotEqual(os.getsid(pid), os.getsid(0))
+
+        os.kill(pid, signal.SIGTERM)
+
+        self.assertTrue(self.wait_for(lambda: not os.path.exists(self.pid_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from dependency_graph import DependencyGraph
+
+
+class TestDependencyGraph(unittest.TestCase):
+	def make_graph(self, dependencies):
+		return DependencyGraph({name: {"depends_on": depends_on} for name, depends_on in dependencies.items()})
+	
+	def test_find_cycle(self):
+		graph = self.make_graph({"web": ["api"], "api": ["db"], "db": ["web"], "cache": []})
+		cycle = graph.find_cycle()
+		
+		self.assertEqual(cycle[0], cycle[-1])
+		self.assertEqual(set(cycle), {"web", "api", "db"})
+	
+	def test_no_cycle(self):
+		graph = self.make_graph({"web": ["api", "cache"], "api": ["db"], "db": [], "cache": ["db"]})
+		self.assertIsNone(graph.find_cycle())
+	
+	def test_self_dependency_is_a_cycle(self):
+		graph = self.make_graph({"web": ["web"]})
+		self.assertEqual(graph.find_cycle(), ["web", "web"])
+	
+	def test_unknown_dependencies(self):
+		graph = self.make_graph({"web": ["api", "missing"], "api": []})
+		self.assertEqual(graph.unknown_dependencies(), {"web": ["missing"]})
+	
+	def test_stop_waves_stop_dependents_first(self):
+		graph = self.make_graph({"web": ["api"], "worker": ["api"], "api": ["db"], "db": [], "cron": []})
+		waves = graph.stop_waves(["web", "worker", "api", "db", "cron"])
+		
+		self.assertEqual(waves, [["cron", "web", "worker"], ["api"], ["db"]])
+	
+	def test_stop_waves_ignore_programs_not_being_stopped(self):
+		graph = self.make_graph({"web": ["db"], "db": []})
+		self.assertEqual(graph.stop_waves(["db"]), [["db"]])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import Mock
+import subprocess
+import threading
+import time
+from event_loop import EventLoop
+
+
+class TestEventLoop(unittest.TestCase):
+    def setUp(self):
+        self.event_loop = EventLoop(Mock())
+        self.event_loop.start()
+
+    def tearDown(self):
+        self.event_loop.stop()
+
+    def watch_and_wait(self, process, timeout=5):
+        exited = threading.Event()
+        result = {}
+
+        def on_exit(pid, returncode):
+            result["pid"] = pid
+            result["returncode"] = returncode
+            exited.set()
+
+        self.event_loop.watch(process.pid, on_exit)
+        self.assertTrue(exited.wait(timeout))
+        return result
+
+    def test_reports_exit_code(self):
+        process = subprocess.Popen(["python", "-c", "import sys; sys.exit(3)"])
+        result = self.watch_and_wait(process)
+
+        self.assertEqual(result["pid"], process.pid)
+        self.assertEqual(result["returncode"], 3)
+
+    def test_reports_signal_as_negative_code(self):
+        process = subprocess.Popen(["sleep", "30"])
+        process.terminate()
+        result = self.watch_and_wait(process)
+
+        self.assertEqual(result["returncode"], -15)
+
+    def test_exit_is_reported_without_polling_delay(self):
+        process = subprocess.Popen(["sleep", "0.2"])
+        start = time.monotonic()
+        self.watch_and_wait(process)
+
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_already_exited_child(self):
+        process = subprocess.Popen(["true"])
+        time.sleep(0.2)
+        result = self.watch_and_wait(process)
+
+        self.assertEqual(result["returncode"], 0)
+
+    def test_non_child_exit_is_reported_without_reaping(self):
+        process = subprocess.Popen(["sleep", "0.2"])
+        exited = threading.Event()
+        result = {}
+
+        def on_exit(pid, returncode):
+            result["returncode"] = returncode
+            exited.set()
+
+        self.event_loop.watch(process.pid, on_exit, child=False)
+
+        self.assertTrue(exited.wait(5))
+        self.assertIsNone(result["returncode"])
+        self.assertEqual(process.wait(timeout=5), 0)
+
+    def test_call_later_runs_timers_in_order(self):
+        fired = []
+        done = threading.Event()
+        self.event_loop.call_later(0.1, lambda: (fired.append("late"), done.set()))
+        self.event_loop.call_later(0.01, lambda: fired.append("early"))
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(fired, ["early", "late"])
+        self.assertEqual(self.event_loop.metrics.get("taskmaster_loop_lag_seconds_count"), 2)
+
+    def test_cancelled_timer_does_not_run(self):
+        fired = []
+        done = threading.Event()
+        timer = self.event_loop.call_later(0.01, lambda: fired.append("cancelled"))
+        timer.cancel()
+        self.event_loop.call_later(0.05, done.set)
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(fired, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import logging
+import logging.handlers
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from logger import RotatingFileHandler, restart_listener, setup_logger, stop_logger
+
+
+class TestLogger(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir='/tmp')
+        self.log_path = os.path.join(self.temp_dir, "taskmaster.log")
+
+    def tearDown(self):
+        stop_logger()
+        taskmaster_logger = logging.getLogger('taskmaster')
+        for handler in list(taskmaster_logger.handlers):
+            taskmaster_logger.removeHandler(handler)
+        shutil.rmtree(self.temp_dir)
+
+    def read_log(self, path=None):
+        with open(path or self.log_path) as f:
+            return f.read()
+
+    def test_records_are_written_off_the_calling_thread(self):
+        log = setup_logger({"logfile": self.log_path})
+        self.assertEqual([type(handler) for handler in log.handlers], [logging.handlers.QueueHandler])
+
+        log.info("Started program: web")
+        stop_logger()
+
+        self.assertIn("INFO - Started program: web", self.read_log())
+
+    def test_level_is_configurable(self):
+        log = setup_logger({"logfile": self.log_path, "loglevel": "WARNING"})
+        log.info("hidden")
+        log.warning("shown")
+        stop_logger()
+
+        output = self.read_log()
+        self.assertNotIn("hidden", output)
+        self.assertIn("shown", output)
+
+    def test_json_format(self):
+        log = setup_logger({"logfile": self.log_path, "logformat": "json"})
+        log.error("Process exited")
+        stop_logger()
+
+        entry = json.loads(self.read_log().splitlines()[0])
+        self.assertEqual(entry["level"], "ERROR")
+        self.assertEqual(entry["message"], "Process exited")
+        self.assertEqual(entry["name"], "taskmaster")
+
+    def test_rotates_by_size(self):
+        log = setup_logger({"logfile": self.log_path, "logmaxbytes": 200, "logbackups": 2})
+        for i in range(20):
+            log.info(f"message {i}")
+        stop_logger()
+
+        self.assertTrue(os.path.exists(self.log_path + ".1"))
+        self.assertTrue(os.path.exists(self.log_path + ".2"))
+        self.assertFalse(os.path.exists(self.log_path + ".3"))
+        self.assertIn("message 19", self.read_log())
+
+    def test_rotates_by_time(self):
+        handler = RotatingFileHandler(self.log_path, backups=1, interval=3600)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        handler.handle(logging.makeLogRecord({"msg": "before"}))
+        handler.rollover_at = time.time() - 1
+        handler.handle(logging.makeLogRecord({"msg": "after"}))
+        handler.close()
+
+        self.assertEqual(self.read_log(self.log_path + ".1"), "before\n")
+        self.assertEqual(self.read_log(), "after\n")
+        self.assertGreater(handler.rollover_at, time.time())
+
+    def test_reconfiguring_keeps_a_single_handler(self):
+        log = setup_logger({"logfile": self.log_path})
+        log.info("first")
+        other_path = os.path.join(self.temp_dir, "other.log")
+        log = setup_logger({"logfile": other_path})
+        log.info("second")
+        stop_logger()
+
+        self.assertEqual(len(log.handlers), 1)
+        self.assertIn("first", self.read_log())
+        self.assertIn("second", self.read_log(other_path))
+
+
+    def test_restarted_listener_logs_from_a_forked_child(self):
+        log = setup_logger({"logfile": self.log_path})
+        pid = os.fork()
+        if pid == 0:
+            restart_listener()
+            log.info("from child")
+            stop_logger()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        log.info("from parent")
+        stop_logger()
+
+        self.assertIn("from child", self.read_log())
+        self.assertIn("from parent", self.read_log())
+
+
+if __name__ == '__main__':
+    unittest.main()
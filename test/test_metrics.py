@@ -0,0 +1,72 @@
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import Mock
+
+from metrics import Metrics, MetricsServer
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_counters_and_summaries(self):
+        self.metrics.inc("taskmaster_process_starts_total", program="web")
+        self.metrics.inc("taskmaster_process_starts_total", program="web")
+        self.metrics.observe("taskmaster_spawn_seconds", 0.25, program="web")
+        self.metrics.observe("taskmaster_spawn_seconds", 0.5, program="web")
+
+        output = self.metrics.render()
+
+        self.assertIn("# TYPE taskmaster_process_starts_total counter", output)
+        self.assertIn('taskmaster_process_starts_total{program="web"} 2', output)
+        self.assertIn("# TYPE taskmaster_spawn_seconds summary", output)
+        self.assertIn('taskmaster_spawn_seconds_sum{program="web"} 0.75', output)
+        self.assertIn('taskmaster_spawn_seconds_count{program="web"} 2', output)
+        self.assertEqual(output.count("# TYPE taskmaster_spawn_seconds "), 1)
+
+    def test_label_values_are_escaped(self):
+        self.metrics.inc("taskmaster_process_exits_total", program='we"b\\', code=-9)
+
+        self.assertIn('taskmaster_process_exits_total{code="-9",program="we\\"b\\\\"} 1', self.metrics.render())
+
+    def test_collectors_are_rendered(self):
+        self.metrics.add_collector(lambda: [("taskmaster_instance_up", {"program": "web", "instance": 0}, 1)])
+
+        output = self.metrics.render()
+
+        self.assertIn("# TYPE taskmaster_instance_up gauge", output)
+        self.assertIn('taskmaster_instance_up{instance="0",program="web"} 1', output)
+
+    def test_set_max_keeps_largest_value(self):
+        self.metrics.set_max("taskmaster_loop_lag_max_seconds", 0.2)
+        self.metrics.set_max("taskmaster_loop_lag_max_seconds", 0.1)
+
+        self.assertEqual(self.metrics.get("taskmaster_loop_lag_max_seconds"), 0.2)
+
+
+class TestMetricsServer(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.server = MetricsServer(self.metrics, "127.0.0.1", 0, Mock())
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def test_serves_metrics(self):
+        self.metrics.inc("taskmaster_sigkill_total", program="web")
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{self.server.port}/metrics", timeout=5) as response:
+            body = response.read().decode()
+            content_type = response.headers["Content-Type"]
+
+        self.assertTrue(content_type.startswith("text/plain"))
+        self.assertIn('taskmaster_sigkill_total{program="web"} 1', body)
+
+    def test_unknown_path(self):
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"http://127.0.0.1:{self.server.port}/", timeout=5)
+        self.assertEqual(error.exception.code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+
+from output_capture import OutputCapture, RotatingLog
+
+
+class TestOutputCapture(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir='/tmp')
+        self.path = os.path.join(self.temp_dir, "program.out")
+        self.capture = OutputCapture(Mock())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_instance_path(self):
+        self.assertEqual(OutputCapture.instance_path("/var/log/web.log", 1, 1), "/var/log/web.log")
+        self.assertEqual(OutputCapture.instance_path("/var/log/web.log", 1, 3), "/var/log/web.1.log")
+        self.assertEqual(OutputCapture.instance_path("/var/log/web", 2, 3), "/var/log/web.2")
+
+    def test_rotating_log_appends_and_rotates(self):
+        with open(self.path, "wb") as f:
+            f.write(b"previous crash\n")
+        log = RotatingLog(self.path, max_bytes=25, backups=2)
+        log.write(b"0123456789\n")
+        log.write(b"abcdefghij\n")
+        log.write(b"ABCDEFGHIJ\n")
+        log.close()
+
+        self.assertEqual(self.read(self.path + ".2"), b"previous crash\n")
+        self.assertEqual(self.read(self.path + ".1"), b"0123456789\nabcdefghij\n")
+        self.assertEqual(self.read(self.path), b"ABCDEFGHIJ\n")
+
+    def test_rotating_log_without_backups_truncates(self):
+        log = RotatingLog(self.path, max_bytes=10, backups=0)
+        log.write(b"0123456789")
+        log.write(b"abc")
+        log.close()
+
+        self.assertEqual(self.read(self.path), b"abc")
+        self.assertFalse(os.path.exists(self.path + ".1"))
+
+    def test_pipes_are_multiplexed_into_shared_file(self):
+        first = self.capture.pipe(self.path, 0, 0)
+        second = self.capture.pipe(self.path, 0, 0)
+        os.write(first, b"first\n")
+        os.write(second, b"second\n")
+        os.close(first)
+        os.close(second)
+
+        self.assertTrue(self.wait_for(
+            lambda: os.path.exists(self.path) and len(self.read(self.path).splitlines()) == 2))
+        self.assertEqual(sorted(self.read(self.path).splitlines()), [b"first", b"second"])
+        self.assertTrue(self.wait_for(lambda: self.path not in self.capture._logs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,17 @@
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 import tempfile
+import copy
+import shutil
 import os
+import resource
+import signal
+import threading
 import time
+from config_parser import ConfigParser
 from process_manager import ProcessManager, ProcessInfo
+from event_loop import EventLoop
+from test_cgroups import CGROUP2_MOUNT
 
 class TestProcessManager(unittest.TestCase):
     def setUp(self):
@@ -70,6 +78,18 @@ class TestProcessManager(unittest.TestCase):
         self.assertIn("test_program", self.process_manager.processes)
         self.assertEqual(len(self.process_manager.processes["test_program"]), 1)
 
+    @patch('subprocess.Popen')
+    def test_restart_all_leaves_idle_programs_stopped(self, mock_popen):
+        mock_popen.return_value.pid = 12345
+        self.config["programs"]["idle_program"] = dict(self.config["programs"]["test_program"], autostart=False)
+        self.process_manager.start_program("test_program")
+
+        self.assertEqual(self.process_manager.running_programs(), ["test_program"])
+        self.process_manager.restart_all_programs()
+
+        self.assertEqual(mock_popen.call_count, 2)
+        self.assertNotIn("idle_program", self.process_manager.processes)
+
     @patch('subprocess.Popen')
     def test_get_status(self, mock_popen):
         mock_process = Mock()
@@ -84,6 +104,40 @@ class TestProcessManager(unittest.TestCase):
         self.assertEqual(status["test_program"][0]["status"], "running")
         self.assertEqual(status["test_program"][0]["pid"], 12345)
 
+    @patch('subprocess.Popen')
+    def test_status_records_are_filtered_and_updated_in_place(self, mock_popen):
+        mock_popen.return_value.pid = 12345
+        mock_popen.return_value.poll.return_value = None
+        self.config["programs"]["other_program"] = dict(self.config["programs"]["test_program"])
+        self.process_manager.start_programs(["test_program", "other_program"])
+        snapshot = self.process_manager._snapshot()
+
+        records = self.process_manager.status_records(["test_program"], ["starting"])
+        self.assertEqual([program_name for program_name, _ in records], ["test_program"])
+        self.assertEqual(self.process_manager.status_records(states=["FATAL"]), [])
+
+        self.process_manager.processes["test_program"][0].state = "FATAL"
+        self.assertIs(self.process_manager._snapshot(), snapshot)
+        self.assertEqual(self.process_manager.get_status(states=["FATAL"])["test_program"][0]["state"], "FATAL")
+
+    @patch('subprocess.Popen')
+    def test_restart_keeps_the_instance_slot_and_name(self, mock_popen):
+        mock_popen.return_value.pid = 12345
+        self.config["programs"]["test_program"]["numprocs"] = 3
+        self.process_manager.start_program("test_program")
+        process_infos = self.process_manager.processes["test_program"]
+        snapshot = self.process_manager._snapshot()
+        old_process_info = process_infos[1]
+
+        self.process_manager._restart_process("test_program", old_process_info)
+
+        self.assertIs(self.process_manager.processes["test_program"], process_infos)
+        self.assertIs(self.process_manager._snapshot(), snapshot)
+        self.assertIsNot(process_infos[1], old_process_info)
+        self.assertEqual(process_infos[1].name, "test_program:01")
+        self.assertEqual(process_infos[1].restarts, 1)
+        self.assertFalse(hasattr(process_infos[1], "__dict__"))
+
     @patch('subprocess.Popen')
     def test_update_config(self, mock_popen):
         mock_process = Mock()
@@ -138,5 +192,701 @@ class TestProcessManager(unittest.TestCase):
         _, kwargs = mock_popen.call_args
         self.assertEqual(kwargs["cwd"], "/tmp")
 
+    @patch('subprocess.Popen')
+    def test_update_config_scales_numprocs_up_without_restart(self, mock_popen):
+        mock_popen.return_value.poll.return_value = None
+        self.process_manager.start_program("test_program")
+        original = self.process_manager.processes["test_program"][0]
+
+        new_config = copy.deepcopy(self.config)
+        new_config["programs"]["test_program"]["numprocs"] = 3
+        self.process_manager.update_config(new_config)
+
+        self.assertEqual(mock_popen.call_count, 3)
+        self.assertEqual(len(self.process_manager.processes["test_program"]), 3)
+        self.assertIs(self.process_manager.processes["test_program"][0], original)
+        mock_popen.return_value.send_signal.assert_not_called()
+
+    @patch('subprocess.Popen')
+    def test_update_config_scale_up_survives_spawn_failures(self, mock_popen):
+        mock_popen.return_value.poll.return_value = None
+        self.process_manager.start_program("test_program")
+        original = self.process_manager.processes["test_program"][0]
+        mock_popen.side_effect = [OSError("exec failed"), mock_popen.return_value]
+
+        new_config = copy.deepcopy(self.config)
+        new_config["programs"]["test_program"]["numprocs"] = 3
+        self.process_manager.update_config(new_config)
+
+        processes = self.process_manager.processes["test_program"]
+        self.assertIs(self.process_manager.config, new_config)
+        self.assertEqual(len(processes), 2)
+        self.assertIs(processes[0], original)
+        self.logger_mock.error.assert_any_call("Failed to start process for program test_program: exec failed")
+
+    @patch('subprocess.Popen')
+    def test_operations_report_progress_per_program(self, mock_popen):
+        mock_popen.return_value.poll.return_value = None
+        self.config["programs"]["test_program"]["stoptime"] = 0
+        self.config["programs"]["other_program"] = dict(self.config["programs"]["test_program"])
+        started, stopped = [], []
+
+        self.process_manager.start_in_dependency_order(["test_program", "other_program"], lambda *step: started.append(step))
+        self.process_manager.stop_in_dependency_order(
+            ["test_program", "other_program", "missing"], lambda *step: stopped.append(step))
+
+        self.assertEqual(started, [(0, 2), (1, 2), (2, 2)])
+        self.assertEqual(stopped[0], (0, 3))
+        self.assertEqual(stopped[-1], (3, 3))
+
+    @patch('subprocess.Popen')
+    def test_update_config_scales_numprocs_down(self, mock_popen):
+        self.config["programs"]["test_program"]["numprocs"] = 3
+        self.process_manager.start_program("test_program")
+        kept = self.process_manager.processes["test_program"][0]
+        surplus = self.process_manager.processes["test_program"][1:]
+
+        new_config = copy.deepcopy(self.config)
+        new_config["programs"]["test_program"]["numprocs"] = 1
+        self.process_manager.update_config(new_config)
+
+        self.assertEqual(self.process_manager.processes["test_program"], [kept])
+        self.assertFalse(kept.stopping)
+        self.assertTrue(all(process_info.stopping for process_info in surplus))
+        self.assertEqual(mock_popen.call_count, 3)
+
+    @patch('subprocess.Popen')
+    def test_update_config_applies_supervisor_fields_in_place(self, mock_popen):
+        self.process_manager.start_program("test_program")
+        original = self.process_manager.processes["test_program"][0]
+
+        new_config = copy.deepcopy(self.config)
+        new_config["programs"]["test_program"]["autorestart"] = "always"
+        new_config["programs"]["test_program"]["startretries"] = 10
+        self.process_manager.update_config(new_config)
+
+        self.assertEqual(mock_popen.call_count, 1)
+        self.assertIs(self.process_manager.processes["test_program"][0], original)
+        self.assertIs(self.process_manager.config["programs"]["test_program"], new_config["programs"]["test_program"])
+
+    @patch('subprocess.Popen')
+    def test_update_config_restarts_on_spawn_field_change(self, mock_popen):
+        self.process_manager.start_program("test_program")
+        original = self.process_manager.processes["test_program"][0]
+
+        new_config = copy.deepcopy(self.config)
+        new_config["programs"]["test_program"]["env"] = {"TEST": "other"}
+        self.process_manager.update_config(new_config)
+
+        self.assertEqual(mock_popen.call_count, 2)
+        self.assertIsNot(self.process_manager.processes["test_program"][0], original)
+        self.assertTrue(original.stopping)
+
+    def _prioritized_programs(self):
+        programs = {}
+        for name, priority in [("third", 30), ("first", 10), ("second", 20)]:
+            program_config = dict(self.config["programs"]["test_program"])
+            program_config.update({"cmd": f"echo {name}", "priority": priority})
+            programs[name] = program_config
+        return programs
+
+    @patch('subprocess.Popen')
+    def test_start_initial_processes_follows_priority(self, mock_popen):
+        self.config["programs"] = self._prioritized_programs()
+        self.config["taskmaster"] = {"maxspawns": 1}
+
+        self.process_manager.start_initial_processes()
+
+        started = [call.args[0][1] for call in mock_popen.call_args_list]
+        self.assertEqual(started, ["first", "second", "third"])
+        self.assertRegex(self.logger_mock.info.call_args.args[0],
+                         r"^Started 3 processes for 3 programs in \d+\.\d{3} seconds$")
+
+    @patch('subprocess.Popen')
+    def test_start_programs_limits_spawns_in_flight(self, mock_popen):
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def slow_spawn(*args, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return Mock()
+
+        mock_popen.side_effect = slow_spawn
+        self.config["programs"]["test_program"]["numprocs"] = 6
+        self.config["taskmaster"] = {"maxspawns": 2}
+
+        self.process_manager.start_program("test_program")
+
+        self.assertEqual(len(self.process_manager.processes["test_program"]), 6)
+        self.assertEqual(in_flight[1], 2)
+
+    @patch('subprocess.Popen')
+    def test_dependents_start_after_dependencies_are_running(self, mock_popen):
+        spawned_at = {}
+
+        def spawn(args, **kwargs):
+            spawned_at[args[1]] = time.monotonic()
+            process = Mock()
+            process.poll.return_value = None
+            return process
+
+        mock_popen.side_effect = spawn
+        base = self.config["programs"]["test_program"]
+        self.config["programs"] = {
+            "db": dict(base, cmd="echo db", starttime=1),
+            "cache": dict(base, cmd="echo cache", starttime=0),
+            "web": dict(base, cmd="echo web", starttime=0, depends_on=["db", "cache"]),
+        }
+
+        self.process_manager.start_initial_processes()
+
+        self.assertEqual(set(spawned_at), {"db", "cache", "web"})
+        self.assertGreaterEqual(spawned_at["web"] - spawned_at["db"], 1)
+        self.assertLess(spawned_at["cache"] - spawned_at["db"], 0.5)
+
+    @patch('subprocess.Popen')
+    def test_dependents_are_skipped_when_dependency_fails(self, mock_popen):
+        mock_popen.return_value.poll.return_value = 1
+        base = self.config["programs"]["test_program"]
+        self.config["programs"] = {
+            "db": dict(base, cmd="echo db", autorestart="never"),
+            "web": dict(base, cmd="echo web", depends_on=["db"]),
+        }
+
+        self.process_manager.start_initial_processes()
+
+        self.assertEqual(mock_popen.call_count, 1)
+        self.assertNotIn("web", self.process_manager.processes)
+
+    @patch('subprocess.Popen')
+    def test_simple_command_skips_shell(self, mock_popen):
+        self.process_manager.start_program("test_program")
+
+        args, kwargs = mock_popen.call_args
+        self.assertEqual(args[0], ["echo", "test"])
+        self.assertFalse(kwargs["shell"])
+        self.assertEqual(kwargs["umask"], 0o022)
+
+    @patch('subprocess.Popen')
+    def test_shell_syntax_uses_shell(self, mock_popen):
+        self.config["programs"]["test_program"]["cmd"] = "echo test | cat"
+        self.process_manager.start_program("test_program")
+
+        args, kwargs = mock_popen.call_args
+        self.assertEqual(args[0], "echo test | cat")
+        self.assertTrue(kwargs["shell"])
+
+    @patch('subprocess.Popen')
+    def test_spawn_setup_is_shared_across_instances(self, mock_popen):
+        self.config["programs"]["test_program"]["numprocs"] = 5
+        with patch('os.environ.copy', return_value={}) as mock_environ_copy, \
+                patch('builtins.open', wraps=open) as mock_open:
+            self.process_manager.start_program("test_program")
+
+        self.assertEqual(mock_popen.call_count, 5)
+        self.assertEqual(mock_environ_copy.call_count, 1)
+        self.assertEqual(mock_open.call_count, 2)
+
+    def test_tracked_pid_is_the_program(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 5)
+        self.process_manager.start_program("test_program")
+        pid = self.process_manager.processes["test_program"][0].process.pid
+        time.sleep(0.2)
+
+        with open(f"/proc/{pid}/comm") as f:
+            self.assertEqual(f.read().strip(), "sleep")
+        self.process_manager.stop_all_programs()
+
+    def test_backoff_delay_grows_exponentially(self):
+        self.assertEqual(self.process_manager._backoff_delay(1), 0)
+        for retries, ceiling in [(2, 1), (3, 2), (4, 4), (20, 60)]:
+            delay = self.process_manager._backoff_delay(retries)
+            self.assertGreaterEqual(delay, ceiling / 2)
+            self.assertLessEqual(delay, ceiling)
+
+    @patch('subprocess.Popen')
+    def test_crash_loop_backs_off_until_fatal(self, mock_popen):
+        mock_popen.return_value.poll.return_value = 1
+        self.process_manager.BACKOFF_BASE = 0.01
+        self.process_manager.start_program("test_program")
+
+        self.process_manager.check_and_restart()
+        self.assertEqual(mock_popen.call_count, 2)
+
+        self.process_manager.check_and_restart()
+        self.assertEqual(self.process_manager.processes["test_program"][0].state, "BACKOFF")
+        self.assertEqual(mock_popen.call_count, 2)
+
+        time.sleep(0.05)
+        self.process_manager.check_and_restart()
+        self.assertEqual(mock_popen.call_count, 3)
+
+        self.process_manager.check_and_restart()
+        time.sleep(0.05)
+        self.process_manager.check_and_restart()
+        self.assertEqual(mock_popen.call_count, 4)
+
+        self.process_manager.check_and_restart()
+        self.assertEqual(self.process_manager.processes["test_program"][0].state, "FATAL")
+        self.assertEqual(self.process_manager.processes["test_program"][0].restarts, 3)
+
+    @patch('subprocess.Popen')
+    def test_running_state_resets_retries(self, mock_popen):
+        mock_popen.return_value.poll.return_value = None
+        self.process_manager.MIN_HEALTHY_TIME = 0
+        self.config["programs"]["test_program"]["starttime"] = 0
+        self.process_manager.start_program("test_program")
+        process_info = self.process_manager.processes["test_program"][0]
+        process_info.retries = 2
+
+        self.process_manager.check_and_restart()
+
+        self.assertEqual(process_info.state, "RUNNING")
+        self.assertEqual(process_info.retries, 0)
+
+    @patch('subprocess.Popen')
+    def test_process_stays_starting_until_starttime(self, mock_popen):
+        mock_popen.return_value.poll.return_value = None
+        self.process_manager.start_program("test_program")
+
+        self.process_manager.check_and_restart()
+
+        self.assertEqual(self.process_manager.get_status()["test_program"][0]["state"], "STARTING")
+
+    def test_exit_event_restarts_process(self):
+        event_loop = EventLoop(self.logger_mock)
+        event_loop.start()
+        self.addCleanup(event_loop.stop)
+        self.config["programs"]["test_program"]["cmd"] = "sleep 0.1"
+        self.config["programs"]["test_program"]["autorestart"] = "always"
+        self.config["programs"]["test_program"]["startretries"] = 1
+        self.config["programs"]["test_program"]["stdout"] = "/dev/null"
+        self.config["programs"]["test_program"]["stderr"] = "/dev/null"
+        process_manager = ProcessManager(self.config, self.logger_mock, event_loop)
+
+        process_manager.start_program("test_program")
+        initial_pid = process_manager.processes["test_program"][0].process.pid
+        deadline = time.monotonic() + 5
+        while process_manager.processes["test_program"][0].restarts == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(process_manager.processes["test_program"][0].restarts, 1)
+        self.assertNotEqual(process_manager.processes["test_program"][0].process.pid, initial_pid)
+
+    def _real_program_config(self, cmd, stoptime):
+        program_config = dict(self.config["programs"]["test_program"])
+        program_config.update({"cmd": cmd, "stoptime": stoptime, "stdout": "/dev/null", "stderr": "/dev/null"})
+        return program_config
+
+    def test_stop_returns_when_children_exit(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 10)
+        self.process_manager.start_program("test_program")
+
+        start = time.monotonic()
+        self.process_manager.stop_program("test_program")
+
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertNotIn("test_program", self.process_manager.processes)
+
+    def test_stop_programs_share_deadline(self):
+        cmd = "exec python -c 'import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(30)'"
+        self.config["programs"] = {
+            "stubborn_a": self._real_program_config(cmd, 1),
+            "stubborn_b": self._real_program_config(cmd, 1),
+        }
+        self.process_manager.start_program("stubborn_a")
+        self.process_manager.start_program("stubborn_b")
+        process_infos = self.process_manager.processes["stubborn_a"] + self.process_manager.processes["stubborn_b"]
+        time.sleep(0.5)
+
+        start = time.monotonic()
+        self.process_manager.stop_programs(["stubborn_a", "stubborn_b"])
+
+        self.assertLess(time.monotonic() - start, 1.9)
+        for process_info in process_infos:
+            self.assertEqual(process_info.process.wait(timeout=5), -9)
+
+    def test_rolling_restart_replaces_processes_in_batches(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 5)
+        self.config["programs"]["test_program"].update({"numprocs": 4, "starttime": 0})
+        self.process_manager.start_program("test_program")
+        original = list(self.process_manager.processes["test_program"])
+
+        self.process_manager.restart_program("test_program", "50%")
+
+        replaced = self.process_manager.processes["test_program"]
+        self.assertEqual(len(replaced), 4)
+        self.assertTrue(all(process_info not in original for process_info in replaced))
+        self.assertTrue(all(process_info.status == "finished" for process_info in original))
+        self.assertTrue(all(process_info.status == "running" for process_info in replaced))
+        self.process_manager.stop_all_programs()
+
+    def test_rolling_restart_stops_on_unhealthy_batch(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 5)
+        self.config["programs"]["test_program"].update({"numprocs": 2, "starttime": 1})
+        self.process_manager.start_program("test_program")
+        original = list(self.process_manager.processes["test_program"])
+
+        self.config["programs"]["test_program"]["cmd"] = "sleep 0.1"
+        with self.assertRaisesRegex(RuntimeError, "Rolling restart aborted for test_program"):
+            self.process_manager.restart_program("test_program", 1)
+
+        processes = self.process_manager.processes["test_program"]
+        self.assertIsNot(processes[0], original[0])
+        self.assertIs(processes[1], original[1])
+        self.assertEqual(original[1].status, "running")
+        self.process_manager.stop_all_programs()
+
+    def test_rolling_restart_aborts_when_a_spawn_fails(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 5)
+        self.config["programs"]["test_program"].update({"numprocs": 2, "starttime": 0})
+        self.process_manager.start_program("test_program")
+        original = list(self.process_manager.processes["test_program"])
+
+        with patch.object(self.process_manager, "_start_process", side_effect=OSError("exec failed")):
+            with self.assertRaisesRegex(RuntimeError, "Rolling restart aborted for test_program"):
+                self.process_manager.restart_program("test_program", 1)
+
+        processes = self.process_manager.processes["test_program"]
+        self.assertIs(processes[0], original[0])
+        self.assertEqual(processes[0].state, "FATAL")
+        self.assertIs(processes[1], original[1])
+        self.assertEqual(original[1].status, "running")
+        self.process_manager.stop_all_programs()
+
+    def test_start_skips_program_that_is_already_running(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 5)
+        self.process_manager.start_program("test_program")
+        running = list(self.process_manager.processes["test_program"])
+
+        self.process_manager.start_program("test_program")
+
+        self.assertEqual(self.process_manager.processes["test_program"], running)
+        self.process_manager.stop_all_programs()
+
+    def test_concurrent_commands_keep_the_table_consistent(self):
+        self.config["programs"] = {
+            name: self._real_program_config("sleep 30", 5) for name in ("alpha", "beta")
+        }
+        spawned = []
+        errors = []
+        create_process_info = self.process_manager._create_process_info
+
+        def tracked_create(*args, **kwargs):
+            process_info = create_process_info(*args, **kwargs)
+            spawned.append(process_info)
+            return process_info
+
+        def run(action):
+            try:
+                for _ in range(5):
+                    action()
+            except Exception as e:
+                errors.append(e)
+
+        with patch.object(self.process_manager, "_create_process_info", side_effect=tracked_create):
+            threads = [
+                threading.Thread(target=run, args=(lambda: self.process_manager.start_programs(["alpha", "beta"]),)),
+                threading.Thread(target=run, args=(lambda: self.process_manager.stop_programs(["beta", "alpha"]),)),
+                threading.Thread(target=run, args=(lambda: self.process_manager.restart_program("alpha"),)),
+                threading.Thread(target=run, args=(self.process_manager.get_status,)),
+                threading.Thread(target=run, args=(self.process_manager.check_and_restart,)),
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(30)
+            self.process_manager.stop_all_programs()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.process_manager.processes, {})
+        for process_info in spawned:
+            self.assertIsNotNone(process_info.process.wait(timeout=5))
+
+    def test_restart_racing_a_stop_leaves_no_orphan(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 5)
+        self.process_manager.start_program("test_program")
+        process_info = self.process_manager.processes["test_program"][0]
+        create_process_info = self.process_manager._create_process_info
+        replacements = []
+
+        def create_during_stop(*args, **kwargs):
+            self.process_manager._claim("test_program")
+            replacement = create_process_info(*args, **kwargs)
+            replacements.append(replacement)
+            return replacement
+
+        with patch.object(self.process_manager, "_create_process_info", side_effect=create_during_stop):
+            self.process_manager._restart_process("test_program", process_info)
+
+        self.assertEqual(self.process_manager.processes["test_program"], [process_info])
+        self.assertEqual(replacements[0].process.wait(timeout=5), -9)
+        self.process_manager.stop_all_programs()
+
+    def test_captured_output_is_kept_per_instance_across_restarts(self):
+        temp_dir = tempfile.mkdtemp(dir='/tmp')
+        self.addCleanup(shutil.rmtree, temp_dir)
+        program_config = self._real_program_config("echo captured; echo failed >&2", 5)
+        program_config.update({
+            "numprocs": 2, "capture": True, "autorestart": "never",
+            "stdout": os.path.join(temp_dir, "out.log"), "stderr": os.path.join(temp_dir, "err.log"),
+        })
+        self.config["programs"]["test_program"] = program_config
+
+        for _ in range(2):
+            self.process_manager.start_program("test_program")
+            for process_info in self.process_manager.processes["test_program"]:
+                process_info.process.wait(timeout=5)
+            self.process_manager.stop_program("test_program")
+
+        expected = {"out.0.log": "captured\n" * 2, "out.1.log": "captured\n" * 2,
+                    "err.0.log": "failed\n" * 2, "err.1.log": "failed\n" * 2}
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and (self.process_manager.output_capture._logs or self.process_manager.output_capture._pending):
+            time.sleep(0.01)
+        for name, content in expected.items():
+            with open(os.path.join(temp_dir, name)) as f:
+                self.assertEqual(f.read(), content)
+
+    def test_tail_keeps_recent_output_of_crashed_instances(self):
+        program_config = self._real_program_config("echo crashed; exit 3", 5)
+        program_config.update({"tailbytes": 1024, "autorestart": "unexpected", "startretries": 1})
+        self.config["programs"]["test_program"] = program_config
+
+        self.process_manager.start_program("test_program")
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and self.process_manager.tail("test_program").get(0, (0, b""))[1] != b"crashed\n" * 2:
+            self.process_manager.check_and_restart()
+            time.sleep(0.05)
+
+        self.assertEqual(self.process_manager.tail("test_program"), {0: (16, b"crashed\ncrashed\n")})
+        self.assertEqual(self.process_manager.tail("test_program", {0: 8}), {0: (16, b"crashed\n")})
+        self.process_manager.stop_all_programs()
+
+    def test_tailed_output_file_is_rotated(self):
+        temp_dir = tempfile.mkdtemp(dir='/tmp')
+        self.addCleanup(shutil.rmtree, temp_dir)
+        program_config = self._real_program_config("printf '%0100d' 0", 5)
+        program_config.update({
+            "tailbytes": 1024, "maxbytes": 150, "backups": 1, "autorestart": "never",
+            "stdout": os.path.join(temp_dir, "out.log"),
+        })
+        self.config["programs"]["test_program"] = program_config
+
+        for _ in range(2):
+            self.process_manager.start_program("test_program")
+            self.process_manager.processes["test_program"][0].process.wait(timeout=5)
+            self.process_manager.stop_program("test_program")
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and self.process_manager.output_capture._logs:
+            time.sleep(0.01)
+
+        self.assertEqual(os.path.getsize(os.path.join(temp_dir, "out.log")), 100)
+        self.assertEqual(os.path.getsize(os.path.join(temp_dir, "out.log.1")), 100)
+
+    def test_metrics_are_counted_in_hot_paths(self):
+        cmd = "exec python -c 'import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(30)'"
+        self.config["programs"]["test_program"] = self._real_program_config(cmd, 0)
+        self.config["programs"]["test_program"]["numprocs"] = 2
+        self.process_manager.start_program("test_program")
+        time.sleep(0.3)
+        self.process_manager.stop_program("test_program")
+        metrics = self.process_manager.metrics
+
+        self.assertEqual(metrics.get("taskmaster_process_starts_total", program="test_program"), 2)
+        self.assertEqual(metrics.get("taskmaster_spawn_seconds_count", program="test_program"), 2)
+        self.assertEqual(metrics.get("taskmaster_sigkill_total", program="test_program"), 2)
+        self.assertEqual(metrics.get("taskmaster_stop_seconds_count", program="test_program"), 1)
+
+    def test_status_includes_sampled_resources(self):
+        event_loop = EventLoop(self.logger_mock)
+        event_loop.start()
+        self.addCleanup(event_loop.stop)
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 5)
+        self.config["taskmaster"] = {"sampleinterval": 0.05}
+        process_manager = ProcessManager(self.config, self.logger_mock, event_loop)
+        process_manager.start_program("test_program")
+        process_manager.start_sampling()
+
+        deadline = time.monotonic() + 5
+        while process_manager.get_status()["test_program"][0]["rss"] is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        status = process_manager.get_status()["test_program"][0]
+        self.assertGreater(status["rss"], 0)
+        self.assertEqual(status["threads"], 1)
+        self.assertGreaterEqual(status["fds"], 3)
+        self.assertIn("taskmaster_instance_rss_bytes", process_manager.metrics.render())
+        process_manager.stop_all_programs()
+
+    def test_resource_limits_are_applied_at_spawn(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 5)
+        self.config["programs"]["test_program"].update({
+            "rlimit_nofile": 64, "rlimit_as": 1024 ** 3, "cpu_affinity": [0], "nice": 5
+        })
+        self.process_manager.start_program("test_program")
+        pid = self.process_manager.processes["test_program"][0].process.pid
+
+        self.assertEqual(resource.prlimit(pid, resource.RLIMIT_NOFILE)[0], 64)
+        self.assertEqual(resource.prlimit(pid, resource.RLIMIT_AS)[0], 1024 ** 3)
+        self.assertEqual(os.sched_getaffinity(pid), {0})
+        self.assertEqual(os.getpriority(os.PRIO_PROCESS, pid), os.getpriority(os.PRIO_PROCESS, 0) + 5)
+        self.process_manager.stop_all_programs()
+
+    def test_resource_limits_reach_processes_forked_by_the_shell(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30 & wait", 5)
+        self.config["programs"]["test_program"]["rlimit_nofile"] = 64
+        self.process_manager.start_program("test_program")
+        pid = self.process_manager.processes["test_program"][0].process.pid
+        children = []
+        deadline = time.monotonic() + 5
+        while not children and time.monotonic() < deadline:
+            with open(f"/proc/{pid}/task/{pid}/children") as file:
+                children = [int(child) for child in file.read().split()]
+            time.sleep(0.01)
+
+        self.assertEqual(resource.prlimit(children[0], resource.RLIMIT_NOFILE)[0], 64)
+        self.process_manager.stop_all_programs()
+
+    def test_failed_recycle_falls_back_to_backoff(self):
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 1)
+        self.process_manager.start_program("test_program")
+        process_info = self.process_manager.processes["test_program"][0]
+
+        with patch.object(self.process_manager, "_start_process", side_effect=OSError("exec failed")):
+            self.process_manager._recycle_process("test_program", process_info, "max_rss")
+
+        self.assertIs(self.process_manager.processes["test_program"][0], process_info)
+        self.assertEqual(process_info.state, "BACKOFF")
+        self.assertEqual(process_info.retries, 2)
+        self.logger_mock.error.assert_any_call("Failed to restart process test_program:00 (max_rss): exec failed")
+        self.process_manager.stop_all_programs()
+
+    def test_instance_over_max_rss_is_restarted_gracefully(self):
+        event_loop = EventLoop(self.logger_mock)
+        event_loop.start()
+        self.addCleanup(event_loop.stop)
+        self.config["programs"]["test_program"] = self._real_program_config("sleep 30", 5)
+        self.config["programs"]["test_program"].update({"max_rss": 1, "max_rss_grace": 0.3})
+        self.config["taskmaster"] = {"sampleinterval": 0.05}
+        process_manager = ProcessManager(self.config, self.logger_mock, event_loop)
+        process_manager.start_program("test_program")
+        original = process_manager.processes["test_program"][0]
+        process_manager.start_sampling()
+
+        deadline = time.monotonic() + 5
+        while process_manager.processes["test_program"][0] is original and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        replacement = process_manager.processes["test_program"][0]
+        self.assertIsNot(replacement, original)
+        self.assertEqual(original.process.wait(timeout=5), -signal.SIGTERM)
+        self.assertEqual(replacement.restarts, 1)
+        self.assertEqual(replacement.retries, 0)
+        self.assertEqual(original.state, "STOPPED")
+        self.assertGreaterEqual(
+            process_manager.metrics.get("taskmaster_process_recycled_total", program="test_program", reason="max_rss"), 1)
+        process_manager.config["programs"]["test_program"]["max_rss"] = None
+        process_manager.stop_all_programs()
+
+    def test_stop_kills_grandchildren_in_the_program_cgroup(self):
+        if not CGROUP2_MOUNT:
+            self.skipTest("needs a writable cgroup v2 hierarchy")
+        root = tempfile.mkdtemp(prefix="taskmaster-test-", dir=CGROUP2_MOUNT)
+        self.addCleanup(os.rmdir, root)
+        self.config["taskmaster"] = {"cgroup": root}
+        self.config["programs"]["test_program"] = self._real_program_config(
+            "sh -c 'trap \"\" TERM; sleep 30' & wait", 1)
+        process_manager = ProcessManager(self.config, self.logger_mock)
+        process_manager.start_program("test_program")
+        process_info = process_manager.processes["test_program"][0]
+        deadline = time.monotonic() + 5
+        while len(process_manager.cgroups.procs(process_info.cgroup)) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        pids = process_manager.cgroups.procs(process_info.cgroup)
+
+        process_manager.stop_program("test_program")
+
+        self.assertEqual(len(pids), 3)
+        self.assertFalse(os.path.exists(os.path.join(root, "test_program")))
+        self.assertEqual(process_manager.metrics.get("taskmaster_sigkill_total", program="test_program"), 1)
+
+    def _checkpointed_manager(self, cmd):
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir, True)
+        self.config["taskmaster"] = {"statefile": os.path.join(state_dir, "state.json")}
+        self.config["programs"]["test_program"] = self._real_program_config(cmd, 2)
+        previous = ProcessManager(copy.deepcopy(self.config), self.logger_mock)
+        previous.start_initial_processes()
+        previous.flush_state()
+        return previous.processes["test_program"][0].process
+
+    def test_live_processes_are_adopted_from_the_state_file(self):
+        process = self._checkpointed_manager("sleep 30")
+
+        process_manager = ProcessManager(self.config, self.logger_mock)
+        process_manager.start_initial_processes()
+        adopted = process_manager.processes["test_program"][0]
+
+        self.assertEqual(adopted.process.pid, process.pid)
+        self.assertEqual(adopted.state, "RUNNING")
+        process_manager.stop_program("test_program")
+        self.assertEqual(process.wait(timeout=5), -15)
+
+    def _boot_twice(self, program_settings):
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir, True)
+        config_file = os.path.join(state_dir, "taskmaster.yaml")
+        with open(config_file, "w") as file:
+            file.write(
+                f"taskmaster:\n  statefile: {state_dir}/state.json\n"
+                "programs:\n  web:\n"
+                "    cmd: \"sh -c 'while true; do echo hi; sleep 0.05; done'\"\n"
+                f"    stdout: {state_dir}/web.out\n    starttime: 0\n    stoptime: 2\n{program_settings}")
+        _, config = ConfigParser(config_file).parse()
+        previous = ProcessManager(config, self.logger_mock)
+        previous.start_initial_processes()
+        previous.flush_state()
+        process = previous.processes["web"][0].process
+
+        _, config = ConfigParser(config_file).parse()
+        process_manager = ProcessManager(config, self.logger_mock)
+        process_manager.start_initial_processes()
+        return process_manager, process, f"{state_dir}/web.out"
+
+    def test_program_writing_to_files_is_adopted(self):
+        process_manager, process, stdout_path = self._boot_twice("")
+        size = os.path.getsize(stdout_path)
+        time.sleep(0.3)
+
+        self.assertEqual(process_manager.processes["web"][0].process.pid, process.pid)
+        self.assertIsNone(process.poll())
+        self.assertGreater(os.path.getsize(stdout_path), size)
+        process_manager.stop_program("web")
+        self.assertEqual(process.wait(timeout=5), -15)
+
+    def test_program_with_piped_output_is_restarted(self):
+        process_manager, process, _ = self._boot_twice("    tailbytes: 1024\n")
+
+        self.assertEqual(process.wait(timeout=5), -15)
+        self.assertNotEqual(process_manager.processes["web"][0].process.pid, process.pid)
+        process_manager.stop_program("web")
+
+    def test_changed_program_is_restarted_instead_of_adopted(self):
+        process = self._checkpointed_manager("sleep 30")
+        self.config["programs"]["test_program"]["cmd"] = "sleep 31"
+
+        process_manager = ProcessManager(self.config, self.logger_mock)
+        process_manager.start_initial_processes()
+
+        self.assertEqual(process.wait(timeout=5), -15)
+        self.assertNotEqual(process_manager.processes["test_program"][0].process.pid, process.pid)
+        process_manager.stop_program("test_program")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
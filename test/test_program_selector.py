@@ -0,0 +1,43 @@
+import unittest
+
+from program_selector import ProgramSelector
+
+
+class TestProgramSelector(unittest.TestCase):
+    def setUp(self):
+        self.config = {
+            "programs": {"web-1": {}, "web-2": {}, "api": {}, "worker": {}},
+            "groups": {"backend": ["api", "worker"]},
+        }
+        self.selector = ProgramSelector(self.config)
+
+    def test_program_and_all(self):
+        self.assertEqual(self.selector.resolve("api"), ["api"])
+        self.assertEqual(self.selector.resolve("all"), ["web-1", "web-2", "api", "worker"])
+
+    def test_group(self):
+        self.assertEqual(self.selector.resolve("backend"), ["api", "worker"])
+
+    def test_glob_and_regex(self):
+        self.assertEqual(self.selector.resolve("web-*"), ["web-1", "web-2"])
+        self.assertEqual(self.selector.resolve("re:(api|web-2)"), ["web-2", "api"])
+
+    def test_comma_separated_selectors_are_deduplicated(self):
+        self.assertEqual(self.selector.resolve("backend, api,web-?"), ["api", "worker", "web-1", "web-2"])
+
+    def test_unknown_selectors(self):
+        with self.assertRaisesRegex(ValueError, "Program db not found"):
+            self.selector.resolve("db")
+        with self.assertRaisesRegex(ValueError, "No programs match db-\\*"):
+            self.selector.resolve("db-*")
+        with self.assertRaisesRegex(ValueError, "Invalid selector"):
+            self.selector.resolve("re:(")
+
+    def test_index_is_cached_per_config(self):
+        selector = ProgramSelector.for_config(self.config)
+        self.assertIs(ProgramSelector.for_config(self.config), selector)
+        self.assertIsNot(ProgramSelector.for_config(dict(self.config)), selector)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import time
+import unittest
+
+from resource_sampler import ResourceSampler
+
+
+class TestResourceSampler(unittest.TestCase):
+    def setUp(self):
+        self.sampler = ResourceSampler()
+        self.addCleanup(self.sampler.close)
+
+    def test_samples_current_process(self):
+        sample = self.sampler.sample([os.getpid()])[os.getpid()]
+
+        self.assertGreater(sample.rss_bytes, 0)
+        self.assertGreaterEqual(sample.threads, 1)
+        self.assertGreater(sample.fds, 2)
+        self.assertGreater(sample.cpu_seconds, 0)
+        self.assertIs(self.sampler.get(os.getpid()), sample)
+
+    def test_cpu_percent_from_consecutive_samples(self):
+        process = subprocess.Popen(["python", "-c", "while True: pass"])
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+        self.sampler.sample([process.pid])
+        time.sleep(0.3)
+
+        sample = self.sampler.sample([process.pid])[process.pid]
+
+        self.assertGreater(sample.cpu_percent, 30)
+
+    def test_stat_handles_are_reused(self):
+        self.sampler.sample([os.getpid()])
+        handle = self.sampler._handles[os.getpid()]
+        self.sampler.sample([os.getpid()])
+
+        self.assertEqual(self.sampler._handles, {os.getpid(): handle})
+
+    def test_exited_processes_are_dropped(self):
+        process = subprocess.Popen(["sleep", "30"])
+        self.sampler.sample([process.pid])
+        process.kill()
+        process.wait()
+
+        self.assertEqual(self.sampler.sample([process.pid]), {})
+        self.assertEqual(self.sampler._handles, {})
+        self.assertIsNone(self.sampler.get(process.pid))
+
+    def test_untracked_pids_are_forgotten(self):
+        self.sampler.sample([os.getpid()])
+        self.sampler.sample([])
+
+        self.assertEqual(self.sampler._handles, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from ring_buffer import OutputBuffers, RingBuffer
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_keeps_the_most_recent_bytes(self):
+        buffer = RingBuffer(8)
+        buffer.write(b"hello ")
+        buffer.write(b"world")
+
+        self.assertEqual(buffer.read(), (11, b"lo world"))
+
+    def test_write_larger_than_capacity(self):
+        buffer = RingBuffer(4)
+        buffer.write(b"ab")
+        buffer.write(b"0123456789")
+
+        self.assertEqual(buffer.read(), (12, b"6789"))
+
+    def test_read_from_offset(self):
+        buffer = RingBuffer(16)
+        buffer.write(b"first\n")
+        offset, _ = buffer.read()
+        buffer.write(b"second\n")
+
+        self.assertEqual(buffer.read(offset), (13, b"second\n"))
+        self.assertEqual(buffer.read(13), (13, b""))
+
+    def test_zero_capacity_keeps_nothing(self):
+        buffer = RingBuffer(0)
+        buffer.write(b"dropped")
+
+        self.assertEqual(buffer.read(), (7, b""))
+
+
+class TestOutputBuffers(unittest.TestCase):
+    def test_buffers_are_kept_per_instance(self):
+        buffers = OutputBuffers(1024)
+        buffers.get("web", 0, 16).write(b"zero")
+        buffers.get("web", 1, 16).write(b"one")
+        buffers.get("worker", 0, 16).write(b"other")
+
+        self.assertEqual(buffers.read("web"), {0: (4, b"zero"), 1: (3, b"one")})
+        self.assertIs(buffers.get("web", 0, 16), buffers.get("web", 0, 16))
+
+    def test_memory_is_capped_globally(self):
+        buffers = OutputBuffers(40)
+        self.assertEqual(buffers.get("web", 0, 32).capacity, 32)
+        self.assertEqual(buffers.get("web", 1, 32).capacity, 8)
+        self.assertEqual(buffers.get("web", 2, 32).capacity, 0)
+        self.assertEqual(buffers.allocated, 40)
+
+    def test_discard_releases_memory(self):
+        buffers = OutputBuffers(64)
+        for slot in range(3):
+            buffers.get("web", slot, 16)
+
+        buffers.discard("web", 1)
+        self.assertEqual(sorted(buffers.read("web")), [0])
+        self.assertEqual(buffers.allocated, 16)
+        buffers.discard("web")
+        self.assertEqual(buffers.allocated, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+
+from state_file import STATE_VERSION, AdoptedProcess, StateFile, proc_start_time
+
+
+class TestStateFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.path = os.path.join(self.directory, "state.json")
+        self.logger = Mock()
+        self.state = {"pid": 1, "programs": {}}
+        self.state_file = StateFile(self.path, self.logger, lambda: self.state)
+
+    def test_flush_replaces_the_file_atomically(self):
+        self.state_file.flush()
+
+        self.assertEqual(self.state_file.load(), dict(self.state, version=STATE_VERSION))
+        self.assertEqual(os.listdir(self.directory), ["state.json"])
+
+    def test_missing_or_corrupt_file_loads_empty(self):
+        self.assertEqual(self.state_file.load(), {})
+        with open(self.path, "w") as file:
+            file.write("{")
+        self.assertEqual(self.state_file.load(), {})
+        with open(self.path, "w") as file:
+            json.dump({"version": STATE_VERSION + 1}, file)
+        self.assertEqual(self.state_file.load(), {})
+
+    def test_mark_dirty_writes_in_the_background(self):
+        self.state_file.mark_dirty()
+        deadline = time.monotonic() + 5
+        while not os.path.exists(self.path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(self.state_file.load()["pid"], 1)
+
+
+class TestAdoptedProcess(unittest.TestCase):
+    def test_tracks_a_process_by_pid_and_start_time(self):
+        process = subprocess.Popen(["sleep", "30"])
+        adopted = AdoptedProcess(process.pid, proc_start_time(process.pid))
+
+        self.assertIsNone(adopted.poll())
+        adopted.send_signal(15)
+        process.wait(timeout=5)
+
+        self.assertEqual(adopted.poll(), -1)
+
+    def test_reused_pid_is_not_the_same_process(self):
+        process = subprocess.Popen(["sleep", "30"])
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+        adopted = AdoptedProcess(process.pid, proc_start_time(process.pid) + 1)
+
+        self.assertEqual(adopted.poll(), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()